@@ -20,6 +20,9 @@ description:
   - The config text specified in C(config) will be used to extract banners
     from it. Banners need to be executed on device in special manner. It
     returns configs with banner removed and a dictionary of banners
+  - Banners that start and end on the same line, multi-character
+    delimiters and the C(^C) delimiter used by C(show running-config) are
+    supported.
 version_added: "2.7"
 options:
   config:
@@ -46,11 +49,18 @@ banners:
   returned: always
   type: dict
 """
+import os
 import re
+import sys
+
 from ansible.plugins.action import ActionBase
 from ansible.module_utils._text import to_text
 from ansible.errors import AnsibleError
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'lib'))
+
+from cisco_ios.config import banner_delimiter, banner_end
+
 try:
     from __main__ import display
 except ImportError:
@@ -58,6 +68,52 @@ except ImportError:
     display = Display()
 
 
+BANNER_RE = re.compile(r'^banner\s+(\w+)\s+(.*)')
+BANNER_MASK = '! banner removed'
+
+
+def iter_banners(config_lines):
+    """ Splits config lines into config and banner chunks in a single pass
+
+    Yields (masked_lines, banner_lines) tuples.  For lines outside of a
+    banner masked_lines is the line itself and banner_lines is None.  When
+    a banner is complete masked_lines has one masked line for each line of
+    the banner and banner_lines has the lines needed to configure it.  A
+    banner that is never terminated is yielded unchanged as config.
+    """
+    banner = None
+    for line in config_lines:
+        if banner is None:
+            match = BANNER_RE.match(line) if line.startswith('banner') else None
+            if match:
+                delimiter, opening, body = banner_delimiter(match.group(2))
+                if delimiter:
+                    header = 'banner %s %s' % (match.group(1), opening)
+                    end = banner_end(body, delimiter)
+                    if end != -1:
+                        # the whole banner is on the same line
+                        yield [BANNER_MASK], [header, body[:end], body[end:].rstrip()]
+                    else:
+                        banner = {'delimiter': delimiter, 'lines': [line],
+                                  'banner': [header] + ([body] if body.strip() else [])}
+                    continue
+            yield [line], None
+        else:
+            banner['lines'].append(line)
+            end = banner_end(line, banner['delimiter'])
+            if end == -1:
+                banner['banner'].append(line)
+                continue
+            if line[:end].strip():
+                banner['banner'].append(line[:end])
+            banner['banner'].append(line[end:].rstrip())
+            yield [BANNER_MASK] * len(banner['lines']), banner['banner']
+            banner = None
+
+    if banner is not None:
+        yield banner['lines'], None
+
+
 class ActionModule(ActionBase):
 
     def run(self, tmp=None, task_vars=None):
@@ -84,54 +140,12 @@ class ActionModule(ActionBase):
         return result
 
     def _extract_banners(self, config):
-        config_lines = config.split('\n')
-        found_banner_start = 0
-        banner_meta = []
-        for linenum, line in enumerate(config_lines):
-            if not found_banner_start:
-                banner_start = re.search(r'^banner\s+(\w+)\s+(.*)', line)
-                if banner_start:
-                    banner_cmd = banner_start.group(1)
-                    try:
-                        banner_delimiter = banner_start.group(2)
-                        banner_delimiter = banner_delimiter.strip()
-                        banner_delimiter_esc = re.escape(banner_delimiter)
-                    except Exception:
-                        continue
-                    banner_start_index = linenum
-                    found_banner_start = 1
-                    continue
-
-            if found_banner_start:
-                # Search for delimiter found in current banner start
-                regex = r'%s' % banner_delimiter_esc
-                banner_end = re.search(regex, line)
-                if banner_end:
-                    found_banner_start = 0
-                    kwargs = {
-                        'banner_cmd': banner_cmd,
-                        'banner_delimiter': banner_delimiter,
-                        'banner_start_index': banner_start_index,
-                        'banner_end_index': linenum,
-                    }
-                    banner_meta.append(kwargs)
-
-        # Build banners from extracted data
-        banner_lines = []
-        for banner in banner_meta:
-            banner_lines.append('banner %s %s' % (banner['banner_cmd'],
-                                banner['banner_delimiter']))
-            banner_conf_lines = config_lines[banner['banner_start_index'] + 1: banner['banner_end_index']]
-            for index, conf_line in enumerate(banner_conf_lines):
-                banner_lines.append(conf_line)
-            banner_lines.append('%s' % banner['banner_delimiter'])
-
-        # Delete banner lines from config
-        for banner in banner_meta:
-            banner_lines_range = range(banner['banner_start_index'],
-                                       banner['banner_end_index'] + 1)
-            for index in banner_lines_range:
-                config_lines[index] = '! banner removed'
+        config_lines = list()
+        banner_lines = list()
+        for masked_lines, banner in iter_banners(config.split('\n')):
+            config_lines.extend(masked_lines)
+            if banner:
+                banner_lines.extend(banner)
 
         configs = '\n'.join(config_lines)
         return (banner_lines, configs)
@@ -0,0 +1,145 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'network'}
+
+DOCUMENTATION = """
+---
+module: ios_capabilities
+author: Ansible Network Team
+short_description: collect device capabilities from Cisco IOS
+description:
+  - Reads the device capabilities from the persistent connection on the
+    controller instead of transferring and running the C(ios_capabilities)
+    module on every run.
+  - When C(cache) is enabled the capabilities are stored on the controller
+    and returned without contacting the device while they are younger than
+    C(ttl) seconds.  Each host has its own cache entry, so the cache works
+    for any number of hosts.
+version_added: "2.7"
+options:
+  cache:
+    description:
+      - Whether to cache the capabilities of the host on the controller.
+    default: no
+    type: bool
+  ttl:
+    description:
+      - The number of seconds the cached capabilities are used for.
+    default: 3600
+"""
+
+EXAMPLES = """
+- name: collect platform capabilities as facts
+  ios_capabilities:
+    cache: yes
+    ttl: 86400
+"""
+
+RETURN = """
+cached:
+  description: whether the capabilities were returned from the cache
+  returned: always
+  type: bool
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+
+from ansible.plugins.action import ActionBase
+from ansible.module_utils._text import to_bytes, to_text
+from ansible.module_utils.connection import Connection, ConnectionError
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible.errors import AnsibleError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'lib'))
+
+from cisco_ios.utils import read_cache, write_cache
+
+try:
+    from __main__ import display
+except ImportError:
+    from ansible.utils.display import Display
+    display = Display()
+
+
+CAPABILITIES_CACHE_NAMESPACE = 'capabilities'
+CAPABILITIES_CACHE_VERSION = 1
+
+
+class ActionModule(ActionBase):
+
+    def run(self, tmp=None, task_vars=None):
+        ''' handler for ios_capabilities '''
+
+        if task_vars is None:
+            task_vars = dict()
+
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+
+        use_cache = boolean(self._task.args.get('cache', False), strict=False)
+        try:
+            ttl = float(self._task.args.get('ttl', 3600))
+        except ValueError as exc:
+            raise AnsibleError('invalid argument: %s' % exc)
+
+        key = self._cache_key(task_vars.get('inventory_hostname'))
+        now = time.time()
+
+        cached = read_cache(CAPABILITIES_CACHE_NAMESPACE, key, CAPABILITIES_CACHE_VERSION) if use_cache else None
+        if cached and now - cached['timestamp'] < ttl:
+            display.vvvv('ios_capabilities: using cached capabilities, ttl not expired')
+            capabilities = cached['capabilities']
+        else:
+            socket_path = getattr(self._connection, 'socket_path', None) or task_vars.get('ansible_socket')
+            if not socket_path:
+                # without a persistent connection the module has to run
+                # with the connection it sets up itself
+                module_result = self._execute_module(module_name='ios_capabilities', module_args={},
+                                                     task_vars=task_vars)
+                if module_result.get('failed'):
+                    return module_result
+                capabilities = module_result['ansible_facts']['cisco_ios']['capabilities']
+            else:
+                try:
+                    capabilities = json.loads(to_text(Connection(socket_path).get_capabilities()))['device_info']
+                except ConnectionError as exc:
+                    return {'failed': True, 'msg': to_text(exc)}
+
+            # one file per host that only expires with its age, capping the
+            # number of files would evict hosts of a large inventory
+            if use_cache:
+                write_cache(CAPABILITIES_CACHE_NAMESPACE, key, CAPABILITIES_CACHE_VERSION,
+                            {'capabilities': capabilities, 'timestamp': now})
+            cached = None
+
+        result.update({
+            'changed': False,
+            'cached': cached is not None,
+            'ansible_facts': {'cisco_ios': {'capabilities': capabilities}}
+        })
+        return result
+
+    def _cache_key(self, host):
+        """ Returns the capabilities cache key for the connection of host
+
+        The persistent connection socket path includes the pid of the
+        playbook run, so the key is made of the parameters the socket path
+        is derived from instead to keep the cache across runs.  The key is
+        the SHA-1 of these parameters as a JSON list.
+        """
+        play_context = self._play_context
+        identity = [host, play_context.remote_addr, play_context.port, play_context.remote_user,
+                    play_context.network_os]
+        return hashlib.sha1(to_bytes(json.dumps(identity), errors='surrogate_or_strict')).hexdigest()
@@ -0,0 +1,202 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'network'}
+
+DOCUMENTATION = """
+---
+module: ios_checkpoint_store
+author: Ansible Network Team
+short_description: manage running-config checkpoints stored on the controller
+description:
+  - Stores running-config snapshots on the controller, compressed and
+    addressed by the SHA-256 of their content so the same configuration is
+    only stored once no matter how many devices or runs it is saved for.
+  - Each host has an index of its snapshots, newest first, so any of the
+    kept generations can be restored.
+version_added: "2.7"
+options:
+  state:
+    description:
+      - C(present) saves C(config) as the newest snapshot of the host.
+        C(query) returns the snapshots of the host.  C(export) writes the
+        snapshot selected by C(checkpoint) to C(dest).  C(prune) removes
+        the snapshots that are no longer referenced by any host.
+    choices: ['present', 'query', 'export', 'prune']
+    default: present
+  config:
+    description:
+      - The running-config to save when C(state=present).  The show
+        running-config header and the last change comments are removed.
+        Mutually exclusive with C(remote_src).
+  remote_src:
+    description:
+      - The name of a configuration file on the device flash to save when
+        C(state=present), such as one written by C(copy running-config).
+        The file is copied from the device over scp and stored byte for
+        byte, so restoring it loads exactly what the device wrote.
+        Mutually exclusive with C(config).
+  filesystem:
+    description:
+      - The filesystem C(remote_src) is stored on.
+    default: "flash:/"
+  checkpoint:
+    description:
+      - The snapshot to export, either the generation (0 is the newest) or
+        the snapshot id or a unique prefix of it.
+    default: 0
+  dest:
+    description:
+      - Path on the controller to write the snapshot to, required when
+        C(state=export).
+  keep:
+    description:
+      - The number of snapshots kept for each host.
+    default: 10
+  path:
+    description:
+      - Path to the store on the controller.  Defaults to the checkpoints
+        directory in the role cache.
+"""
+
+EXAMPLES = """
+- name: save the checkpoint file written by the device to the checkpoint store
+  ios_checkpoint_store:
+    remote_src: chk_ansible
+  register: ios_checkpoint
+
+- name: export the previous generation for restore
+  ios_checkpoint_store:
+    state: export
+    checkpoint: 1
+    dest: "{{ ios_config_temp_dir.path }}/chk_ansible"
+"""
+
+RETURN = """
+checkpoint:
+  description: the id of the snapshot that was saved or exported
+  returned: when state is present or export
+  type: str
+checkpoints:
+  description: the snapshots of the host, newest first
+  returned: when state is query
+  type: list
+removed:
+  description: the number of snapshots removed
+  returned: when state is prune
+  type: int
+"""
+import os
+import sys
+import tempfile
+
+from ansible.plugins.action import ActionBase
+from ansible.module_utils._text import to_text
+from ansible.module_utils.connection import Connection, ConnectionError
+from ansible.errors import AnsibleError
+from ansible.utils.path import unfrackpath
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'lib'))
+
+from cisco_ios import checkpoints
+from cisco_ios.utils import ENABLE_SCP_COMMANDS, SCP_READY_FACT, connection_state_fact, get_connection_state
+
+try:
+    from __main__ import display
+except ImportError:
+    from ansible.utils.display import Display
+    display = Display()
+
+
+class ActionModule(ActionBase):
+
+    def run(self, tmp=None, task_vars=None):
+        ''' handler for ios_checkpoint_store '''
+
+        if task_vars is None:
+            task_vars = dict()
+
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+
+        state = self._task.args.get('state', 'present')
+        if state not in ('present', 'query', 'export', 'prune'):
+            raise AnsibleError('state must be one of present, query, export, prune, got %s' % state)
+
+        host = task_vars.get('inventory_hostname', 'localhost')
+
+        try:
+            store = checkpoints.get_store(self._task.args.get('path'))
+
+            if state == 'present':
+                config = self._task.args.get('config')
+                remote_src = self._task.args.get('remote_src')
+                if (config is None) == (remote_src is None):
+                    raise AnsibleError('one of `config` or `remote_src` is required')
+                keep = int(self._task.args.get('keep', 10))
+                if remote_src is not None:
+                    path = (self._task.args.get('filesystem') or 'flash:/') + remote_src
+                    data = self._get_file(task_vars, path, result)
+                    result['checkpoint'] = checkpoints.save(store, host, data, keep=keep, raw=True)
+                else:
+                    result['checkpoint'] = checkpoints.save(store, host, config, keep=keep)
+                display.vvv('ios_checkpoint_store: saved checkpoint %s for %s' % (result['checkpoint'], host))
+
+            elif state == 'query':
+                result['checkpoints'] = checkpoints.read_index(store, host)
+
+            elif state == 'export':
+                try:
+                    dest = unfrackpath(self._task.args['dest'])
+                except KeyError as exc:
+                    raise AnsibleError('missing required argument: %s' % exc)
+                checkpoint_id = checkpoints.resolve(store, host, self._task.args.get('checkpoint', 0))
+                checkpoints.export(store, checkpoint_id, dest)
+                result['checkpoint'] = checkpoint_id
+
+            else:
+                result['removed'] = checkpoints.prune(store)
+                result['changed'] = result['removed'] > 0
+
+        except (checkpoints.CheckpointError, ConnectionError) as exc:
+            return {'failed': True, 'msg': to_text(exc)}
+        except (IOError, OSError) as exc:
+            return {'failed': True, 'msg': 'checkpoint store error: %s' % to_text(exc)}
+
+        return result
+
+    def _get_file(self, task_vars, path, result):
+        """ Returns the content of the file at path on the device
+
+        The scp server is enabled first unless it already was for the
+        persistent connection of the host.
+        """
+        socket_path = getattr(self._connection, 'socket_path', None) or task_vars.get('ansible_socket')
+        if not socket_path:
+            raise AnsibleError('ios_checkpoint_store requires a persistent connection to copy '
+                               'remote_src, please use connection type network_cli')
+        conn = Connection(socket_path)
+
+        if not get_connection_state(task_vars, SCP_READY_FACT, socket_path).get('enabled'):
+            display.vvv('ios_checkpoint_store: enabling the scp server')
+            conn.run_commands(commands=ENABLE_SCP_COMMANDS)
+            result['ansible_facts'] = connection_state_fact(SCP_READY_FACT, socket_path, {'enabled': True})
+
+        fd, dest = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            display.vvv('ios_checkpoint_store: copying %s from the device' % path)
+            conn.get_file(source=path, destination=dest, proto='scp',
+                          timeout=conn.get_option('persistent_command_timeout'))
+            with open(dest, 'rb') as f:
+                return f.read()
+        finally:
+            os.remove(dest)
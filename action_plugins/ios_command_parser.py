@@ -0,0 +1,160 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'network'}
+
+DOCUMENTATION = """
+---
+module: ios_command_parser
+author: Ansible Network Team
+short_description: parse command output using compiled parser templates
+description:
+  - Drop in replacement for the C(command_parser) action from the
+    ansible-network.network-engine role.  Parser templates are compiled
+    once, with all regular expressions precompiled, and cached in memory
+    and on disk so subsequent runs do not need to load the YAML source.
+  - Templates that use directives which are not supported by the compiled
+    engine are passed on to the C(command_parser) action.
+version_added: "2.7"
+options:
+  file:
+    description:
+      - Path to the parser template file.  Mutually exclusive with C(dir).
+  dir:
+    description:
+      - Path to a directory of parser templates.  All of the C(.yaml),
+        C(.yml) and C(.json) files in the directory are used.  Mutually
+        exclusive with C(file).
+  content:
+    description:
+      - The text output to parse.
+    required: yes
+  native:
+    description:
+      - Whether to use the native parser of a template shipped with the
+        role when there is one.  When C(no) the template is always run by
+        the compiled engine.
+    default: yes
+    type: bool
+"""
+
+EXAMPLES = """
+- name: parse the output of show version
+  ios_command_parser:
+    file: "{{ role_path }}/parser_templates/cli/show_version.yaml"
+    content: "{{ output.stdout }}"
+"""
+
+RETURN = """
+ansible_facts:
+  description: the facts exported by the parser templates
+  returned: always
+  type: dict
+included:
+  description: the list of parser templates used to parse the content
+  returned: always
+  type: list
+"""
+import os
+import sys
+
+from ansible.plugins.action import ActionBase
+from ansible.module_utils._text import to_text
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible.errors import AnsibleError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'lib'))
+
+from cisco_ios.command_parser import ParserError, UnsupportedDirective, parse_template
+from cisco_ios.parsers import get_native_parser
+from cisco_ios.utils import merge_facts, merge_existing_facts
+
+try:
+    from __main__ import display
+except ImportError:
+    from ansible.utils.display import Display
+    display = Display()
+
+
+VALID_FILE_EXTENSIONS = ('.yaml', '.yml', '.json')
+
+
+class ActionModule(ActionBase):
+
+    def run(self, tmp=None, task_vars=None):
+        ''' handler for ios_command_parser '''
+
+        if task_vars is None:
+            task_vars = dict()
+
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+
+        try:
+            source_dir = self._task.args.get('dir')
+            source_file = self._task.args.get('file')
+            content = self._task.args['content']
+        except KeyError as exc:
+            raise AnsibleError('missing required argument: %s' % exc)
+
+        if source_dir and source_file:
+            raise AnsibleError('`dir` and `file` are mutually exclusive arguments')
+        elif not source_dir and not source_file:
+            raise AnsibleError('one of `dir` or `file` is required')
+
+        if source_dir:
+            source_dir = os.path.expanduser(source_dir)
+            sources = [os.path.join(source_dir, f) for f in sorted(os.listdir(source_dir))
+                       if os.path.splitext(f)[1] in VALID_FILE_EXTENSIONS]
+        else:
+            sources = [os.path.expanduser(source_file)]
+
+        use_native = boolean(self._task.args.get('native', True), strict=False)
+
+        facts = {}
+        for src in sources:
+            if not os.path.exists(src):
+                raise AnsibleError('src [%s] does not exist' % src)
+            native = get_native_parser(src) if use_native else None
+            try:
+                if native is not None:
+                    res = native(content)
+                else:
+                    res = parse_template(src, content, self._templar, task_vars)
+            except UnsupportedDirective as exc:
+                display.vvv('ios_command_parser: %s, using command_parser for %s' % (to_text(exc), src))
+                res = self._run_command_parser(src, content, task_vars)
+            except ParserError as exc:
+                raise AnsibleError('unable to parse %s: %s' % (src, to_text(exc)))
+            facts = merge_facts(facts, res)
+
+        result.update({
+            'ansible_facts': merge_existing_facts(facts, task_vars),
+            'included': sources
+        })
+        return result
+
+    def _run_command_parser(self, src, content, task_vars):
+        new_task = self._task.copy()
+        new_task.args = {'file': src, 'content': content}
+
+        action = self._shared_loader_obj.action_loader.get(
+            'command_parser', task=new_task, connection=self._connection,
+            play_context=self._play_context, loader=self._loader,
+            templar=self._templar, shared_loader_obj=self._shared_loader_obj
+        )
+        if action is None:
+            raise AnsibleError('unable to load parser engine `command_parser`, please verify the '
+                               'ansible-network.network-engine role is installed')
+        res = action.run(task_vars=task_vars)
+        if res.get('failed'):
+            raise AnsibleError(res.get('msg', 'command_parser failed to parse %s' % src))
+        return res.get('ansible_facts', {})
@@ -0,0 +1,115 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'network'}
+
+DOCUMENTATION = """
+---
+module: ios_config_delta
+author: Ansible Network Team
+short_description: generate the minimal configuration to merge onto a device
+description:
+  - Compares the configuration to be merged with the running-config on the
+    controller and returns only the lines that would change the device
+    configuration.  Sections are included only when some of their lines
+    change.  C(no) commands are always included, unless the running-config
+    already displays them or they negate a command that is disabled by
+    default and not configured.
+  - Merging the returned delta has the same effect as merging the full
+    configuration, an empty delta means the configuration is already
+    applied and nothing needs to be loaded.
+version_added: "2.7"
+options:
+  config:
+    description:
+      - The configuration text that would be merged onto the device.
+    required: yes
+  running_config:
+    description:
+      - The current running-config of the device.  When not specified the
+        running-config is retrieved from the device.
+"""
+
+EXAMPLES = """
+- name: generate the configuration delta
+  ios_config_delta:
+    config: "{{ config_manager_text }}"
+    running_config: "{{ ios_running_config_before.stdout }}"
+  register: ios_config_delta
+"""
+
+RETURN = """
+delta:
+  description: the lines that need to be merged onto the device
+  returned: always
+  type: str
+lines:
+  description: the number of lines in the delta
+  returned: always
+  type: int
+"""
+import os
+import sys
+
+from ansible.plugins.action import ActionBase
+from ansible.module_utils._text import to_text
+from ansible.module_utils.connection import Connection, ConnectionError
+from ansible.errors import AnsibleError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'lib'))
+
+from cisco_ios import config
+
+try:
+    from __main__ import display
+except ImportError:
+    from ansible.utils.display import Display
+    display = Display()
+
+
+class ActionModule(ActionBase):
+
+    def run(self, tmp=None, task_vars=None):
+        ''' handler for ios_config_delta '''
+
+        if task_vars is None:
+            task_vars = dict()
+
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+
+        try:
+            candidate = self._task.args['config']
+        except KeyError as exc:
+            raise AnsibleError('missing required argument: %s' % exc)
+
+        running_config = self._task.args.get('running_config')
+        if running_config is None:
+            socket_path = getattr(self._connection, 'socket_path', None) or task_vars.get('ansible_socket')
+            if not socket_path:
+                raise AnsibleError('ios_config_delta requires a persistent connection to retrieve '
+                                   'the running-config, please use connection type network_cli')
+            try:
+                running_config = Connection(socket_path).get_config(source='running')
+            except ConnectionError as exc:
+                return {'failed': True, 'msg': to_text(exc)}
+
+        lines = config.delta(config.parse(to_text(running_config)), config.parse(to_text(candidate)))
+        delta = '\n'.join(lines)
+        count = len(delta.splitlines())
+        display.vvv('ios_config_delta: %d lines need to be loaded' % count)
+
+        result.update({
+            'changed': False,
+            'delta': delta,
+            'lines': count
+        })
+        return result
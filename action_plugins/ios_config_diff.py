@@ -0,0 +1,144 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'network'}
+
+DOCUMENTATION = """
+---
+module: ios_config_diff
+author: Ansible Network Team
+short_description: generate a configuration diff on the controller
+description:
+  - Computes a hierarchical, indentation aware diff between two IOS
+    configurations on the controller.  The output is formatted like
+    C(show archive config differences) so no files need to be written
+    to the device flash to generate the diff.
+  - When C(after) is not specified the current running-config is retrieved
+    from the device.  When C(candidate) is specified the diff previews the
+    changes C(candidate) would make without connecting to the device.
+version_added: "2.7"
+options:
+  before:
+    description:
+      - The configuration text to compare from, typically the running-config
+        retrieved before the configuration was loaded.  When not specified
+        the current running-config is retrieved from the device.
+  after:
+    description:
+      - The configuration text to compare to.  Mutually exclusive with
+        C(candidate).
+  candidate:
+    description:
+      - Configuration text that would be loaded onto the device.  The diff
+        is computed between C(before) and the configuration that would
+        result from loading C(candidate).  Mutually exclusive with C(after).
+  replace:
+    description:
+      - Whether C(candidate) replaces the configuration or is merged with it.
+    type: bool
+    default: no
+"""
+
+EXAMPLES = """
+- name: diff the running-config against the config before the load
+  ios_config_diff:
+    before: "{{ ios_running_config_before.stdout }}"
+  register: ios_config_diff
+
+- name: preview the changes without loading the configuration
+  ios_config_diff:
+    before: "{{ ios_running_config_before.stdout }}"
+    candidate: "{{ config_manager_text }}"
+"""
+
+RETURN = """
+stdout:
+  description: the diff formatted like C(show archive config differences)
+  returned: always
+  type: str
+stdout_lines:
+  description: the diff split into lines
+  returned: always
+  type: list
+"""
+import os
+import sys
+
+from ansible.plugins.action import ActionBase
+from ansible.module_utils._text import to_text
+from ansible.module_utils.connection import Connection, ConnectionError
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible.errors import AnsibleError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'lib'))
+
+from cisco_ios import config
+
+try:
+    from __main__ import display
+except ImportError:
+    from ansible.utils.display import Display
+    display = Display()
+
+
+class ActionModule(ActionBase):
+
+    def run(self, tmp=None, task_vars=None):
+        ''' handler for ios_config_diff '''
+
+        if task_vars is None:
+            task_vars = dict()
+
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+
+        before = self._task.args.get('before')
+        after = self._task.args.get('after')
+        candidate = self._task.args.get('candidate')
+        replace = boolean(self._task.args.get('replace', False), strict=False)
+
+        if after is not None and candidate is not None:
+            raise AnsibleError('`after` and `candidate` are mutually exclusive arguments')
+
+        try:
+            if before is None:
+                before = self._get_running_config(task_vars)
+            if after is None and candidate is None:
+                after = self._get_running_config(task_vars)
+        except ConnectionError as exc:
+            return {'failed': True, 'msg': to_text(exc)}
+
+        before_tree = config.parse(to_text(before))
+        if candidate is not None:
+            candidate_tree = config.parse(to_text(candidate))
+            after_tree = candidate_tree if replace else config.merge(before_tree, candidate_tree)
+        else:
+            after_tree = config.parse(to_text(after))
+
+        lines = config.diff(before_tree, after_tree)
+        stdout = config.format_diff(lines)
+
+        result.update({
+            'changed': bool(lines),
+            'stdout': stdout,
+            'stdout_lines': stdout.splitlines()
+        })
+        if lines:
+            result['diff'] = {'prepared': stdout}
+        return result
+
+    def _get_running_config(self, task_vars):
+        socket_path = getattr(self._connection, 'socket_path', None) or task_vars.get('ansible_socket')
+        if not socket_path:
+            raise AnsibleError('ios_config_diff requires a persistent connection to retrieve '
+                               'the running-config, please use connection type network_cli')
+        display.vvv('ios_config_diff: retrieving running-config')
+        return Connection(socket_path).get_config(source='running')
@@ -0,0 +1,195 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'network'}
+
+DOCUMENTATION = """
+---
+module: ios_device_cache
+author: Ansible Network Team
+short_description: cache the running-config of a device
+description:
+  - Returns the running-config of the device, only retrieving it from the
+    device the first time it is requested for the persistent connection of
+    the host.  The output is stored in the disk cache on the controller and
+    only its cache key and last configuration change are kept in the
+    C(ios_device_cache) fact, so later tasks in the play reuse it without
+    carrying the configuration in their variables.
+  - Before the cached running-config is returned it is validated against
+    the last configuration change reported by the device, so changes made
+    outside of the role are never missed.  The cache is discarded when the
+    playbook is run again.
+  - Tasks that change the configuration should invalidate the cache by
+    setting C(state=absent).
+version_added: "2.7"
+options:
+  source:
+    description:
+      - The output to return.
+    choices: ['running']
+    default: running
+  state:
+    description:
+      - Set to C(absent) to invalidate the cached output.
+    choices: ['present', 'absent']
+    default: present
+  fetch:
+    description:
+      - Whether to retrieve the output from the device when it is not
+        cached.  When C(no) and the output is not cached, C(stdout) is
+        empty and C(cached) is false.
+    default: yes
+    type: bool
+"""
+
+EXAMPLES = """
+- name: get the current running-config
+  ios_device_cache:
+    source: running
+  register: ios_running_config
+
+- name: invalidate the cache after loading the configuration
+  ios_device_cache:
+    state: absent
+"""
+
+RETURN = """
+stdout:
+  description: the output of the source command
+  returned: when state is present
+  type: str
+cached:
+  description: whether the output was returned from the cache
+  returned: when state is present
+  type: bool
+"""
+import hashlib
+import json
+import os
+import re
+import sys
+
+from ansible.plugins.action import ActionBase
+from ansible.module_utils._text import to_bytes, to_text
+from ansible.module_utils.connection import Connection, ConnectionError
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible.errors import AnsibleError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'lib'))
+
+from cisco_ios.utils import connection_state_fact, get_connection_state, read_cache, remove_cache, write_cache
+
+try:
+    from __main__ import display
+except ImportError:
+    from ansible.utils.display import Display
+    display = Display()
+
+
+CACHE_FACT = 'ios_device_cache'
+
+# the disk cache holding the output, the fact only holds its key
+CACHE_NAMESPACE = 'device_cache'
+CACHE_VERSION = 1
+
+SOURCES = {
+    'running': 'show running-config',
+}
+
+# the running-config header line that changes with every configuration change
+LAST_CHANGE_COMMAND = 'show running-config | include Last configuration change'
+LAST_CHANGE_RE = re.compile(r'^! Last configuration change.*$', re.M)
+
+
+def last_change(output):
+    """ Returns the last configuration change line of the output or None """
+    match = LAST_CHANGE_RE.search(output)
+    return match.group(0).strip() if match else None
+
+
+class ActionModule(ActionBase):
+
+    def run(self, tmp=None, task_vars=None):
+        ''' handler for ios_device_cache '''
+
+        if task_vars is None:
+            task_vars = dict()
+
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+
+        source = self._task.args.get('source') or 'running'
+        state = self._task.args.get('state', 'present')
+        fetch = boolean(self._task.args.get('fetch', True), strict=False)
+
+        if source not in SOURCES:
+            raise AnsibleError('source must be one of %s, got %s' % (', '.join(sorted(SOURCES)), source))
+        if state not in ('present', 'absent'):
+            raise AnsibleError('state must be one of present, absent, got %s' % state)
+
+        socket_path = getattr(self._connection, 'socket_path', None) or task_vars.get('ansible_socket')
+        cache = get_connection_state(task_vars, CACHE_FACT, socket_path)
+
+        if state == 'absent':
+            entry = cache.pop(source, None)
+            if entry:
+                remove_cache(CACHE_NAMESPACE, entry['key'])
+            result['ansible_facts'] = connection_state_fact(CACHE_FACT, socket_path, cache)
+            return result
+
+        if not socket_path:
+            raise AnsibleError('ios_device_cache requires a persistent connection, '
+                               'please use connection type network_cli')
+        conn = Connection(socket_path)
+
+        try:
+            entry = cache.get(source)
+            output = None
+            if entry and self._is_current(conn, entry['stamp']):
+                output = read_cache(CACHE_NAMESPACE, entry['key'], CACHE_VERSION)
+            elif entry:
+                display.vvv('ios_device_cache: the configuration has changed since %s was cached' % source)
+            result['cached'] = output is not None
+
+            if output is None and fetch:
+                output = to_text(conn.run_commands(commands=[SOURCES[source]])[0])
+                if entry:
+                    remove_cache(CACHE_NAMESPACE, entry['key'])
+                cache.pop(source, None)
+                stamp = last_change(output)
+                # output without the line can not be validated and is not cached
+                if stamp is not None:
+                    key = self._cache_key(socket_path, source, stamp)
+                    write_cache(CACHE_NAMESPACE, key, CACHE_VERSION, output)
+                    cache[source] = {'key': key, 'stamp': stamp}
+                result['ansible_facts'] = connection_state_fact(CACHE_FACT, socket_path, cache)
+            elif output is not None:
+                display.vvv('ios_device_cache: using cached %s output' % source)
+        except ConnectionError as exc:
+            return {'failed': True, 'msg': to_text(exc)}
+
+        result['stdout'] = output or ''
+        return result
+
+    def _cache_key(self, socket_path, source, stamp):
+        """ Returns the disk cache key of the output for the connection """
+        identity = [socket_path, source, stamp]
+        return hashlib.sha1(to_bytes(json.dumps(identity), errors='surrogate_or_strict')).hexdigest()
+
+    def _is_current(self, conn, stamp):
+        """ Returns whether the cached running-config is still current
+
+        The configuration can be changed by tasks outside of the role that
+        do not invalidate the cache, so the last configuration change line
+        of the cached output is compared with the one on the device.
+        """
+        current = to_text(conn.run_commands(commands=[LAST_CHANGE_COMMAND])[0])
+        return last_change(current) == stamp
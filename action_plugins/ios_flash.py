@@ -0,0 +1,200 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'network'}
+
+DOCUMENTATION = """
+---
+module: ios_flash
+author: Ansible Network Team
+short_description: track and manage files on the device flash
+description:
+  - Tracks whether files exist on the device flash in the C(ios_flash_files)
+    fact so files are only looked up on the device when their state is not
+    already known.  The state is kept for the persistent connection of the
+    host and is discarded when the playbook is run again.
+  - Unknown files are looked up with a targeted C(dir) of each file instead
+    of listing the whole flash, and files are deleted in a single exchange
+    with the device.
+  - In check mode no file is deleted, the files are looked up instead and
+    C(changed) reports whether any of them would be deleted.
+version_added: "2.7"
+options:
+  files:
+    description:
+      - The names of the files on flash.
+    required: yes
+  state:
+    description:
+      - C(query) returns whether the files exist, looking up the files whose
+        state is not known.  C(absent) deletes the files, the delete is
+        always sent to the device since the files may have been written
+        by something other than the role.
+        C(present) records that the files were written to flash by another
+        task without connecting to the device.
+    choices: ['query', 'absent', 'present']
+    default: query
+  filesystem:
+    description:
+      - The filesystem the files are stored on.
+    default: "flash:/"
+"""
+
+EXAMPLES = """
+- name: check if the checkpoint file exists
+  ios_flash:
+    files:
+      - "{{ ios_checkpoint_filename }}"
+  register: ios_flash
+
+- name: remove temp files from flash
+  ios_flash:
+    files:
+      - "{{ ios_config_temp_file }}"
+      - "{{ ios_checkpoint_filename }}"
+    state: absent
+"""
+
+RETURN = """
+exists:
+  description: a dict of file name to whether the file exists on flash
+  returned: always
+  type: dict
+"""
+import os
+import re
+import sys
+
+from ansible.plugins.action import ActionBase
+from ansible.module_utils._text import to_text
+from ansible.module_utils.connection import Connection, ConnectionError
+from ansible.module_utils.six import string_types
+from ansible.errors import AnsibleError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'lib'))
+
+from cisco_ios.utils import connection_state_fact, get_connection_state
+
+try:
+    from __main__ import display
+except ImportError:
+    from ansible.utils.display import Display
+    display = Display()
+
+
+CACHE_FACT = 'ios_flash_files'
+
+# the error IOS returns for dir and delete when the file does not exist
+NO_SUCH_FILE_RE = re.compile(r'No such file|File not found|Could not find', re.I)
+ERROR_RE = re.compile(r'^\s*%\s*Error', re.M)
+
+
+class ActionModule(ActionBase):
+
+    def run(self, tmp=None, task_vars=None):
+        ''' handler for ios_flash '''
+
+        if task_vars is None:
+            task_vars = dict()
+
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+
+        try:
+            files = self._task.args['files']
+        except KeyError as exc:
+            raise AnsibleError('missing required argument: %s' % exc)
+
+        if isinstance(files, string_types):
+            files = [files]
+
+        state = self._task.args.get('state', 'query')
+        if state not in ('query', 'absent', 'present'):
+            raise AnsibleError('state must be one of query, absent, present, got %s' % state)
+
+        filesystem = self._task.args.get('filesystem') or 'flash:/'
+        paths = dict((name, filesystem + name) for name in files)
+        socket_path = getattr(self._connection, 'socket_path', None) or task_vars.get('ansible_socket')
+        known = get_connection_state(task_vars, CACHE_FACT, socket_path)
+
+        try:
+            if self._play_context.check_mode and state != 'query':
+                # nothing is written, only report what would change
+                unknown = [paths[name] for name in files if paths[name] not in known]
+                exists = dict(known)
+                if unknown:
+                    exists.update(self._probe(socket_path, unknown))
+                result['changed'] = state == 'absent' and any(exists[paths[name]] for name in files)
+                result['exists'] = dict((name, exists[paths[name]]) for name in files)
+                return result
+
+            if state == 'present':
+                for name in files:
+                    known[paths[name]] = True
+
+            elif state == 'absent':
+                # a file believed to be absent may still have been written
+                # outside of the role, deleting it is a single exchange and
+                # avoids the overwrite prompt of a later copy
+                result['changed'] = self._delete(socket_path, [paths[name] for name in files])
+                for name in files:
+                    known[paths[name]] = False
+
+            else:
+                unknown = [paths[name] for name in files if paths[name] not in known]
+                if unknown:
+                    known.update(self._probe(socket_path, unknown))
+
+        except ConnectionError as exc:
+            return {'failed': True, 'msg': to_text(exc)}
+
+        result.update({
+            'exists': dict((name, known[paths[name]]) for name in files),
+            'ansible_facts': connection_state_fact(CACHE_FACT, socket_path, known)
+        })
+        return result
+
+    def _run(self, socket_path, commands):
+        """ Sends all of the commands in a single exchange
+
+        Errors are returned as the output of the command instead of raising
+        so a missing file does not abort the remaining commands.
+        """
+        if not socket_path:
+            raise AnsibleError('ios_flash requires a persistent connection, '
+                               'please use connection type network_cli')
+        display.vvv('ios_flash: %s' % ', '.join(commands))
+        return [to_text(out) for out in Connection(socket_path).run_commands(commands=commands, check_rc=False)]
+
+    def _probe(self, socket_path, paths):
+        """ Yields (path, exists) looking up each file with a targeted dir """
+        outputs = self._run(socket_path, ['dir %s' % path for path in paths])
+        for path, output in zip(paths, outputs):
+            if ERROR_RE.search(output):
+                if not NO_SUCH_FILE_RE.search(output):
+                    raise ConnectionError('unable to look up %s: %s' % (path, output.strip()))
+                yield path, False
+            else:
+                yield path, True
+
+    def _delete(self, socket_path, paths):
+        """ Deletes the files and returns whether any file was deleted """
+        if not paths:
+            return False
+        outputs = self._run(socket_path, ['delete /force %s' % path for path in paths])
+        changed = False
+        for path, output in zip(paths, outputs):
+            if ERROR_RE.search(output):
+                if not NO_SUCH_FILE_RE.search(output):
+                    raise ConnectionError('unable to delete %s: %s' % (path, output.strip()))
+            else:
+                changed = True
+        return changed
@@ -0,0 +1,212 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'network'}
+
+DOCUMENTATION = """
+---
+module: ios_put_config
+author: Ansible Network Team
+short_description: copy a configuration file to the device flash over scp
+description:
+  - Copies configuration text or a file on the controller to the device
+    flash over scp using the persistent connection of the host.
+  - The scp server is enabled on the device only the first time a file is
+    copied over the persistent connection of the host, it is enabled again
+    by later runs of the playbook.  The MD5 of the file on flash is verified against
+    the MD5 of the content, the copy is skipped when the device already has
+    the same file and retried when the copy does not match.
+  - In check mode nothing is copied, C(changed) reports whether the file on
+    flash differs from the content.
+version_added: "2.7"
+options:
+  content:
+    description:
+      - The configuration text to copy.  Mutually exclusive with C(src).
+  src:
+    description:
+      - Path to the file on the controller to copy.  Mutually exclusive
+        with C(content).
+  dest:
+    description:
+      - The name of the file on flash.
+    required: yes
+  filesystem:
+    description:
+      - The filesystem the file is copied to.
+    default: "flash:/"
+  retries:
+    description:
+      - The number of times the copy is retried when the MD5 of the copied
+        file does not match.
+    default: 2
+"""
+
+EXAMPLES = """
+- name: copy configuration to device
+  ios_put_config:
+    content: "{{ ios_config_text }}"
+    dest: tmp_ansible
+"""
+
+RETURN = """
+md5:
+  description: the MD5 of the file on flash
+  returned: always
+  type: str
+transferred:
+  description: whether the file was copied, false when the device already had the file
+  returned: always
+  type: bool
+"""
+import hashlib
+import os
+import re
+import sys
+import tempfile
+
+from ansible.plugins.action import ActionBase
+from ansible.module_utils._text import to_bytes, to_text
+from ansible.module_utils.connection import Connection, ConnectionError
+from ansible.errors import AnsibleError
+from ansible.utils.path import unfrackpath
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'lib'))
+
+from cisco_ios.utils import ENABLE_SCP_COMMANDS, SCP_READY_FACT, connection_state_fact, get_connection_state
+
+try:
+    from __main__ import display
+except ImportError:
+    from ansible.utils.display import Display
+    display = Display()
+
+
+# the ios_flash fact tracking the files on flash
+FLASH_FACT = 'ios_flash_files'
+
+MD5_RE = re.compile(r'=\s*([0-9a-fA-F]{32})\s*$', re.M)
+
+
+class ActionModule(ActionBase):
+
+    def run(self, tmp=None, task_vars=None):
+        ''' handler for ios_put_config '''
+
+        if task_vars is None:
+            task_vars = dict()
+
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+
+        content = self._task.args.get('content')
+        src = self._task.args.get('src')
+
+        try:
+            dest = self._task.args['dest']
+        except KeyError as exc:
+            raise AnsibleError('missing required argument: %s' % exc)
+
+        if (content is None) == (src is None):
+            raise AnsibleError('one of `content` or `src` is required')
+
+        if src is not None:
+            with open(unfrackpath(src), 'rb') as f:
+                data = f.read()
+        else:
+            data = to_bytes(content, errors='surrogate_or_strict')
+
+        filesystem = self._task.args.get('filesystem') or 'flash:/'
+        retries = int(self._task.args.get('retries', 2))
+        path = filesystem + dest
+        md5 = hashlib.md5(data).hexdigest()
+
+        socket_path = getattr(self._connection, 'socket_path', None) or task_vars.get('ansible_socket')
+        if not socket_path:
+            raise AnsibleError('ios_put_config requires a persistent connection, '
+                               'please use connection type network_cli')
+        conn = Connection(socket_path)
+
+        facts = {}
+        flash = get_connection_state(task_vars, FLASH_FACT, socket_path)
+        transferred = False
+
+        try:
+            # the device may already have the file from a previous attempt
+            remote_md5 = self._remote_md5(conn, path) if flash.get(path) is not False else None
+
+            if self._play_context.check_mode:
+                result.update({'changed': remote_md5 != md5, 'md5': md5, 'transferred': False})
+                return result
+
+            scp_ready = get_connection_state(task_vars, SCP_READY_FACT, socket_path).get('enabled')
+            error = None
+            attempt = 0
+            while remote_md5 != md5:
+                if attempt > retries:
+                    return {'failed': True, 'msg': 'unable to copy %s after %d attempts: %s' % (path, attempt, error)}
+                attempt += 1
+
+                if remote_md5 is not None:
+                    # a different or partially copied file is left on flash
+                    conn.run_commands(commands=['delete /force %s' % path])
+
+                if not scp_ready:
+                    display.vvv('ios_put_config: enabling the scp server')
+                    conn.run_commands(commands=ENABLE_SCP_COMMANDS)
+                    scp_ready = True
+                    facts.update(connection_state_fact(SCP_READY_FACT, socket_path, {'enabled': True}))
+
+                try:
+                    self._copy(conn, data, path)
+                    transferred = True
+                except ConnectionError as exc:
+                    # the scp server may have been disabled by a configuration
+                    # change since it was enabled, enable it again on retry
+                    error = to_text(exc)
+                    scp_ready = False
+                else:
+                    error = 'md5 of the copied file does not match'
+
+                remote_md5 = self._remote_md5(conn, path)
+                if remote_md5 != md5:
+                    display.vvv('ios_put_config: copy of %s failed on attempt %d: %s' % (path, attempt, error))
+
+        except ConnectionError as exc:
+            return {'failed': True, 'msg': to_text(exc)}
+
+        flash[path] = True
+        facts.update(connection_state_fact(FLASH_FACT, socket_path, flash))
+
+        result.update({
+            'changed': transferred,
+            'md5': md5,
+            'transferred': transferred,
+            'ansible_facts': facts
+        })
+        return result
+
+    def _remote_md5(self, conn, path):
+        """ Returns the MD5 of the file on flash or None if it does not exist """
+        output = to_text(conn.run_commands(commands=['verify /md5 %s' % path], check_rc=False)[0])
+        match = MD5_RE.search(output)
+        return match.group(1).lower() if match else None
+
+    def _copy(self, conn, data, path):
+        fd, src = tempfile.mkstemp()
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            display.vvv('ios_put_config: copying %d bytes to %s' % (len(data), path))
+            conn.copy_file(source=src, destination=path, proto='scp',
+                           timeout=conn.get_option('persistent_command_timeout'))
+        finally:
+            os.remove(src)
@@ -0,0 +1,140 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'network'}
+
+DOCUMENTATION = """
+---
+module: ios_rollout_plan
+author: Ansible Network Team
+short_description: plan the waves a configuration change is rolled out in
+description:
+  - Splits the hosts into a canary wave followed by waves of at most
+    C(wave_size) hosts, with at most C(site_limit) hosts of the same site
+    in any wave.
+  - The hosts are returned in wave order together with the size of each
+    wave, suitable for adding the hosts to a group with C(add_host) and
+    rolling out to the group with the play C(serial) keyword.
+version_added: "2.7"
+options:
+  hosts:
+    description:
+      - The hosts to plan the rollout for.
+    required: yes
+  site_var:
+    description:
+      - The name of the host variable that holds the site of the host.
+        Hosts without the variable are all considered to be in the same
+        site.
+    default: site
+  canary:
+    description:
+      - The number of hosts in the canary wave.  Set to 0 to disable the
+        canary wave.
+    default: 1
+  wave_size:
+    description:
+      - The maximum number of hosts in a wave.
+    default: 50
+  site_limit:
+    description:
+      - The maximum number of hosts of the same site in a wave.  There is
+        no limit when not specified.
+"""
+
+EXAMPLES = """
+- name: plan the rollout waves
+  ios_rollout_plan:
+    hosts: "{{ ansible_play_hosts }}"
+    canary: 2
+    wave_size: 200
+    site_limit: 10
+  register: ios_rollout_plan
+  run_once: true
+"""
+
+RETURN = """
+hosts:
+  description: the hosts in the order they are rolled out to
+  returned: always
+  type: list
+batches:
+  description: the number of hosts in each wave
+  returned: always
+  type: list
+waves:
+  description: the hosts in each wave
+  returned: always
+  type: list
+"""
+import os
+import sys
+
+from ansible.plugins.action import ActionBase
+from ansible.errors import AnsibleError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'lib'))
+
+from cisco_ios import rollout
+
+try:
+    from __main__ import display
+except ImportError:
+    from ansible.utils.display import Display
+    display = Display()
+
+
+class ActionModule(ActionBase):
+
+    def run(self, tmp=None, task_vars=None):
+        ''' handler for ios_rollout_plan '''
+
+        if task_vars is None:
+            task_vars = dict()
+
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+
+        try:
+            hosts = self._task.args['hosts']
+        except KeyError as exc:
+            raise AnsibleError('missing required argument: %s' % exc)
+
+        site_var = self._task.args.get('site_var') or 'site'
+        site_limit = self._task.args.get('site_limit')
+
+        try:
+            canary = int(self._task.args.get('canary', 1))
+            wave_size = int(self._task.args.get('wave_size', 50))
+            site_limit = int(site_limit) if site_limit not in (None, '') else None
+        except ValueError as exc:
+            raise AnsibleError('invalid argument: %s' % exc)
+
+        hostvars = task_vars.get('hostvars', {})
+        sites = dict()
+        for host in hosts:
+            if host in hostvars:
+                sites[host] = hostvars[host].get(site_var)
+
+        try:
+            waves = rollout.plan(hosts, sites, canary=canary, wave_size=wave_size, site_limit=site_limit)
+        except ValueError as exc:
+            raise AnsibleError('unable to plan rollout: %s' % exc)
+
+        display.vvv('ios_rollout_plan: %d hosts in %d waves' % (len(hosts), len(waves)))
+
+        result.update({
+            'changed': False,
+            'hosts': [host for wave in waves for host in wave],
+            'batches': [len(wave) for wave in waves],
+            'waves': waves
+        })
+        return result
@@ -0,0 +1,413 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'network'}
+
+DOCUMENTATION = """
+---
+module: ios_run_cli
+author: Ansible Network Team
+short_description: run a set of cli commands and parse the output as facts
+description:
+  - Sends all of the commands specified in C(commands) to the remote device
+    over a single call to the persistent connection, parses each output with
+    its parser template and returns the merged set of facts.  This replaces
+    running one C(cli) task per command when collecting facts.
+  - Parser templates shipped with the role that have a native parser, such
+    as C(show_interfaces.yaml), are parsed natively in a single pass over
+    the output.
+  - When C(cache) is enabled the facts parsed from each command are stored
+    on the controller together with a hash of the command output.  Outputs
+    that did not change since the previous run are not parsed again, and
+    commands with a C(ttl) are not run at all while their cached facts are
+    younger than C(ttl) seconds.  Changing the parser, or a variable the
+    parser references, invalidates the cached facts.
+  - When C(metrics) is enabled each command is sent to the device in its own
+    call so the time the device took to answer can be told apart from the
+    time spent parsing the output on the controller.
+  - Outputs of C(textfsm_parser) templates are parsed with the compiled
+    template cache of the role when textfsm is installed, the rows are
+    returned in the fact named by C(name) like the C(textfsm_parser) action.
+  - When C(parse_workers) is set the output of C(command_parser) and
+    C(textfsm_parser) templates is parsed by a pool of worker processes
+    shared by all forks on the controller instead of in the fork itself.  Outputs the pool does not
+    parse within five minutes are parsed in the fork.
+version_added: "2.7"
+options:
+  commands:
+    description:
+      - List of command map entries to run.  Each entry supports the
+        C(command), C(parser), C(engine), C(name), C(groups) and C(ttl) keys
+        as documented in C(vars/get_facts_command_map.yaml).
+    required: yes
+  subset:
+    description:
+      - List of groups used to filter the entries in C(commands).  Only
+        entries that belong to at least one of the groups are run.  When
+        not specified, all entries are run.
+  parser_paths:
+    description:
+      - Ordered list of directories to search for the parser templates.  The
+        first directory that contains the parser is used.  Parsers that are
+        specified as an absolute path are used as is.
+    required: yes
+  cache:
+    description:
+      - Whether to cache the parsed facts of each command on the controller.
+    type: bool
+    default: no
+  metrics:
+    description:
+      - Whether to record the device round-trip time, output size, parse
+        time and fact size of each command and return the records as
+        C(metrics).
+    type: bool
+    default: no
+  metrics_file:
+    description:
+      - Path to a file on the controller the metrics records are appended
+        to as JSON lines.  Setting this option enables C(metrics).
+  parse_workers:
+    description:
+      - The number of processes in the parse pool shared by all forks.  The
+        pool is started by the first fork that uses it and exits when it has
+        been idle for a minute.  Set to 0 to parse in the fork.
+    default: 0
+"""
+
+EXAMPLES = """
+- name: run commands and parse output
+  ios_run_cli:
+    commands:
+      - command: show version
+        parser: show_version.yaml
+    parser_paths:
+      - "{{ role_path }}/parser_templates/cli"
+
+- name: run commands and record how long each command took
+  ios_run_cli:
+    commands: "{{ ios_get_facts_commands }}"
+    parser_paths:
+      - "{{ role_path }}/parser_templates/cli"
+    metrics_file: /var/log/ansible/ios_run_cli.jsonl
+"""
+
+RETURN = """
+ansible_facts:
+  description: the merged set of facts returned by all of the parsers
+  returned: always
+  type: dict
+included:
+  description: the list of parser templates used to parse the output
+  returned: always
+  type: list
+cached:
+  description: the commands whose facts were returned from the cache
+  returned: always
+  type: list
+metrics:
+  description:
+    - one record per command with the C(host), C(command), C(parser),
+      C(cached), the device round-trip time C(rtt) in seconds, C(output_bytes),
+      the C(parse_time) and C(parse_cpu_time) in seconds and the size of
+      the parsed facts as C(fact_bytes)
+  returned: when metrics is enabled
+  type: list
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+
+from ansible.plugins.action import ActionBase
+from ansible.module_utils._text import to_text
+from ansible.module_utils._text import to_bytes
+from ansible.module_utils.connection import Connection, ConnectionError
+from ansible.module_utils.parsing.convert_bool import boolean
+from ansible.module_utils.six import string_types
+from ansible.errors import AnsibleError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'lib'))
+
+from cisco_ios import parse_pool, textfsm_templates
+from cisco_ios.command_parser import ParserError, UnsupportedDirective, parse_template
+from cisco_ios.parsers import get_native_parser
+from cisco_ios.utils import cpu_time, merge_facts, merge_existing_facts, read_cache, write_cache
+
+try:
+    from __main__ import display
+except ImportError:
+    from ansible.utils.display import Display
+    display = Display()
+
+
+VALID_ENGINES = ('command_parser', 'textfsm_parser')
+
+FACT_CACHE_NAMESPACE = 'facts'
+FACT_CACHE_VERSION = 1
+
+
+class ActionModule(ActionBase):
+
+    def run(self, tmp=None, task_vars=None):
+        ''' handler for ios_run_cli '''
+
+        if task_vars is None:
+            task_vars = dict()
+
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+
+        try:
+            commands = self._task.args['commands']
+            parser_paths = self._task.args['parser_paths']
+        except KeyError as exc:
+            raise AnsibleError('missing required argument: %s' % exc)
+
+        subset = self._task.args.get('subset')
+        if isinstance(subset, string_types):
+            raise AnsibleError('subset must be in the form a list, not string')
+
+        use_cache = boolean(self._task.args.get('cache', False), strict=False)
+        metrics_file = self._task.args.get('metrics_file')
+        use_metrics = bool(metrics_file) or boolean(self._task.args.get('metrics', False), strict=False)
+        try:
+            parse_workers = int(self._task.args.get('parse_workers') or 0)
+        except ValueError as exc:
+            raise AnsibleError('invalid argument: %s' % exc)
+
+        entries = self._select_entries(commands or [], subset)
+        if not entries:
+            result.update({'changed': False, 'ansible_facts': {}, 'included': [], 'cached': []})
+            if use_metrics:
+                result['metrics'] = []
+            return result
+
+        parsers = [self._find_parser(entry['parser'], parser_paths) for entry in entries]
+
+        host = task_vars.get('inventory_hostname', 'localhost')
+        keys = [self._cache_key(host, entry, parser, task_vars) for entry, parser in zip(entries, parsers)]
+        cached = [read_cache(FACT_CACHE_NAMESPACE, key, FACT_CACHE_VERSION) if use_cache else None for key in keys]
+
+        # commands whose cached facts are younger than their ttl are not run
+        now = time.time()
+        pending = [index for index, entry in enumerate(entries)
+                   if not (cached[index] and entry.get('ttl') and now - cached[index]['timestamp'] < float(entry['ttl']))]
+
+        responses = dict()
+        rtts = dict()
+        if pending:
+            socket_path = getattr(self._connection, 'socket_path', None) or task_vars.get('ansible_socket')
+            if not socket_path:
+                raise AnsibleError('ios_run_cli requires a persistent connection, '
+                                   'please use connection type network_cli')
+            connection = Connection(socket_path)
+
+            try:
+                if use_metrics:
+                    # one call per command to time each answer of the device
+                    for index in pending:
+                        start = time.time()
+                        responses[index] = connection.run_commands(commands=[entries[index]['command']])[0]
+                        rtts[index] = time.time() - start
+                else:
+                    outputs = connection.run_commands(commands=[entries[index]['command'] for index in pending])
+                    responses = dict(zip(pending, outputs))
+            except ConnectionError as exc:
+                return {'failed': True, 'msg': to_text(exc)}
+
+        facts = {}
+        from_cache = list()
+        records = list()
+        parse_vars = dict(task_vars)
+        for index, (entry, parser) in enumerate(zip(entries, parsers)):
+            parse_time = parse_cpu_time = 0.0
+            if index not in responses:
+                display.vvvv('ios_run_cli: using cached facts for `%s`, ttl not expired' % entry['command'])
+                parsed = cached[index]['facts']
+                from_cache.append(entry['command'])
+            else:
+                output = responses[index]
+                fingerprint = hashlib.sha1(to_bytes(output, errors='surrogate_or_strict')).hexdigest()
+                if cached[index] and cached[index]['fingerprint'] == fingerprint:
+                    display.vvvv('ios_run_cli: using cached facts for `%s`, output not changed' % entry['command'])
+                    parsed = cached[index]['facts']
+                    from_cache.append(entry['command'])
+                else:
+                    display.vvvv('ios_run_cli: parsing `%s` with %s' % (entry['command'], parser))
+                    start, cpu_start = time.time(), cpu_time()
+                    res = self._parse(entry, parser, output, parse_vars, parse_workers)
+                    # the pool reports the CPU time of the worker that parsed the output
+                    parse_time, parse_cpu_time = time.time() - start, res.pop('parse_cpu_time', cpu_time() - cpu_start)
+                    if res.get('failed'):
+                        res.setdefault('msg', 'failed to parse output of `%s`' % entry['command'])
+                        return res
+                    parsed = res.get('ansible_facts', {})
+
+                # the timestamp only matters for commands with a ttl
+                if use_cache and (entry.get('ttl') or not cached[index] or cached[index]['fingerprint'] != fingerprint):
+                    write_cache(FACT_CACHE_NAMESPACE, keys[index], FACT_CACHE_VERSION,
+                                {'fingerprint': fingerprint, 'facts': parsed, 'timestamp': now})
+
+            if use_metrics:
+                output = responses.get(index)
+                records.append({
+                    'timestamp': now,
+                    'host': host,
+                    'command': entry['command'],
+                    'parser': parser,
+                    'cached': entry['command'] in from_cache,
+                    'rtt': round(rtts[index], 6) if index in rtts else None,
+                    'output_bytes': len(to_bytes(output, errors='surrogate_or_strict')) if output is not None else None,
+                    'parse_time': round(parse_time, 6),
+                    'parse_cpu_time': round(parse_cpu_time, 6),
+                    'fact_bytes': len(json.dumps(parsed, default=to_text))
+                })
+
+            facts = merge_facts(facts, parsed)
+            parse_vars.update(facts)
+
+        result.update({
+            'changed': False,
+            'ansible_facts': merge_existing_facts(facts, task_vars),
+            'included': parsers,
+            'cached': from_cache
+        })
+        if use_metrics:
+            result['metrics'] = records
+            if metrics_file:
+                self._write_metrics(metrics_file, records)
+        return result
+
+    def _write_metrics(self, path, records):
+        """ Appends the records to path as JSON lines
+
+        The records of a task are written in a single append so records of
+        hosts running in parallel are not interleaved.  Errors are only
+        reported as a warning, metrics must not fail fact collection.
+        """
+        data = to_bytes(''.join(json.dumps(record, sort_keys=True) + '\n' for record in records))
+        try:
+            path = os.path.expanduser(path)
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+        except (IOError, OSError) as exc:
+            display.warning('ios_run_cli: unable to write metrics to %s: %s' % (path, to_text(exc)))
+
+    def _cache_key(self, host, entry, parser, task_vars):
+        """ Returns the fact cache key for the command of host
+
+        The key includes the modification time of the parser so the cached
+        facts are not used once the parser changes, and a hash of the
+        variables the parser can reference so the cached facts are not used
+        once one of them changes.
+        """
+        try:
+            stamp = os.stat(parser).st_mtime
+            names = parse_pool.referenced_names(parser)
+        except (IOError, OSError):
+            stamp, names = None, ()
+        variables = hashlib.sha1()
+        for name in sorted(names):
+            if name in task_vars:
+                try:
+                    value = json.dumps(task_vars[name], sort_keys=True)
+                except (TypeError, ValueError):
+                    # objects such as hostvars are not serializable
+                    value = type(task_vars[name]).__name__
+                variables.update(to_bytes('%s=%s\n' % (name, value), errors='surrogate_or_strict'))
+        identity = (host, entry['command'], parser, stamp, entry.get('engine'), entry.get('name'), variables.hexdigest())
+        return hashlib.sha1(to_bytes(repr(identity), errors='surrogate_or_strict')).hexdigest()
+
+    def _select_entries(self, commands, subset):
+        entries = list()
+        for entry in commands:
+            if 'command' not in entry or 'parser' not in entry:
+                raise AnsibleError('command map entries require both `command` and `parser` keys')
+            if subset is not None and not set(subset).intersection(entry.get('groups') or []):
+                continue
+            engine = entry.get('engine') or 'command_parser'
+            if engine not in VALID_ENGINES:
+                raise AnsibleError('invalid engine `%s` for command `%s`, expected one of %s'
+                                   % (engine, entry['command'], ', '.join(VALID_ENGINES)))
+            entries.append(entry)
+        return entries
+
+    def _find_parser(self, parser, parser_paths):
+        if os.path.isabs(parser):
+            candidates = [parser]
+        else:
+            candidates = [os.path.join(os.path.expanduser(path), parser) for path in parser_paths]
+
+        for candidate in candidates:
+            if os.path.isfile(candidate):
+                return candidate
+
+        raise AnsibleError('unable to find parser `%s` in %s' % (parser, ', '.join(parser_paths)))
+
+    def _parse(self, entry, parser, output, task_vars, parse_workers=0):
+        engine = entry.get('engine') or 'command_parser'
+
+        if engine == 'command_parser':
+            if parse_workers:
+                try:
+                    facts, parse_cpu_time = parse_pool.parse(parser, output, task_vars, parse_workers)
+                    return {'ansible_facts': facts, 'parse_cpu_time': parse_cpu_time}
+                except parse_pool.ParsePoolError as exc:
+                    display.vvv('ios_run_cli: %s, parsing %s in the fork' % (to_text(exc), parser))
+            native = get_native_parser(parser)
+            if native is not None:
+                return {'ansible_facts': native(output)}
+            try:
+                return {'ansible_facts': parse_template(parser, output, self._templar, task_vars)}
+            except UnsupportedDirective as exc:
+                display.vvv('ios_run_cli: %s, using command_parser for %s' % (to_text(exc), parser))
+            except ParserError as exc:
+                return {'failed': True, 'msg': 'unable to parse %s: %s' % (parser, to_text(exc))}
+
+        elif textfsm_templates.textfsm is not None:
+            # the pool workers keep the compiled templates between parses
+            if parse_workers:
+                try:
+                    facts, parse_cpu_time = parse_pool.parse(parser, output, task_vars, parse_workers,
+                                                             engine=engine, name=entry.get('name'))
+                    return {'ansible_facts': facts, 'parse_cpu_time': parse_cpu_time}
+                except parse_pool.ParsePoolError as exc:
+                    display.vvv('ios_run_cli: %s, parsing %s in the fork' % (to_text(exc), parser))
+            try:
+                return {'ansible_facts': textfsm_templates.parse_facts(parser, output, entry.get('name'))}
+            except textfsm_templates.TemplateError as exc:
+                return {'failed': True, 'msg': 'unable to parse %s: %s' % (parser, to_text(exc))}
+
+        new_task = self._task.copy()
+        new_task.args = {'file': parser, 'content': output}
+        if engine == 'textfsm_parser' and entry.get('name'):
+            new_task.args['name'] = entry['name']
+
+        kwargs = {
+            'task': new_task,
+            'connection': self._connection,
+            'play_context': self._play_context,
+            'loader': self._loader,
+            'templar': self._templar,
+            'shared_loader_obj': self._shared_loader_obj
+        }
+
+        action = self._shared_loader_obj.action_loader.get(engine, **kwargs)
+        if action is None:
+            raise AnsibleError('unable to load parser engine `%s`, please verify the '
+                               'ansible-network.network-engine role is installed' % engine)
+
+        return action.run(task_vars=task_vars)
@@ -17,6 +17,14 @@ import hashlib
 from ansible.plugins.action import ActionBase
 
 
+USER_RE = re.compile(r'(?:u|\s{2}u)sername (\S+)')
+USER_LINE_RE = re.compile(r'username (\S+) .+$')
+USER_KEY_RE = re.compile(r'username (\S+)$')
+KEY_HASH_RE = re.compile(r'key-hash (\S+ \S+(?: .+)?)$', re.M)
+VIEW_RE = re.compile(r'view (\S+)', re.M)
+PRIVILEGE_RE = re.compile(r'privilege (\S+)', re.M)
+
+
 class UserManager:
 
     def __init__(self, new_users, user_config_data):
@@ -34,34 +42,65 @@ class UserManager:
             return 'ssh-rsa %s' % hashlib.md5(base64.b64decode(sshkey)).hexdigest().upper()
 
     def _parse_view(self, data):
-        match = re.search(r'view (\S+)', data, re.M)
+        match = VIEW_RE.search(data)
         if match:
             return match.group(1)
 
     def _parse_sshkey(self, data):
-        match = re.search(r'key-hash (\S+ \S+(?: .+)?)$', data, re.M)
+        match = KEY_HASH_RE.search(data)
         if match:
             return match.group(1)
 
     def _parse_privilege(self, data):
-        match = re.search(r'privilege (\S+)', data, re.M)
+        match = PRIVILEGE_RE.search(data)
         if match:
             return int(match.group(1))
 
-    def generate_existing_users(self):
-        match = re.findall(r'(?:^(?:u|\s{2}u))sername (\S+)', self.__user_config_data, re.M)
-        if not match:
-            return []
-
-        existing_users = []
-
-        for user in set(match):
-            regex = r'username %s .+$' % user
-            cfg = re.findall(regex, self.__user_config_data, re.M)
-            cfg = '\n'.join(cfg)
-            sshregex = r'username %s\n\s+key-hash .+$' % user
-            sshcfg = re.findall(sshregex, self.__user_config_data, re.M)
-            sshcfg = '\n'.join(sshcfg)
+    def _tokenize(self):
+        """ Walks the config once and groups the lines of each user
+
+        Returns the names of the users found in the config, the
+        `username <name> ...` lines of each user and the key-hash lines
+        that follow a `username <name>` line in the pubkey-chain.
+        """
+        names = set()
+        lines = {}
+        keys = {}
+        key_user = None
+
+        for line in self.__user_config_data.splitlines():
+            if key_user is not None:
+                if not line.strip():
+                    continue
+                if line[0].isspace() and line.lstrip().startswith('key-hash '):
+                    keys.setdefault(key_user, []).append(line.lstrip())
+                key_user = None
+
+            if 'username ' not in line:
+                continue
+
+            match = USER_RE.match(line)
+            if match:
+                names.add(match.group(1))
+
+            match = USER_LINE_RE.search(line)
+            if match:
+                lines.setdefault(match.group(1), []).append(match.group(0))
+            else:
+                match = USER_KEY_RE.search(line)
+                if match:
+                    key_user = match.group(1)
+
+        return names, lines, keys
+
+    def index_existing_users(self):
+        """ Returns a dict of username to the existing user record """
+        names, lines, keys = self._tokenize()
+
+        existing_users = {}
+        for user in names:
+            cfg = '\n'.join(lines.get(user, []))
+            sshcfg = '\n'.join(keys.get(user, []))
 
             obj = {
                 'name': user,
@@ -70,22 +109,21 @@ class UserManager:
                 'view': self._parse_view(cfg)
             }
 
-            filtered = {k: v for k, v in obj.items() if v is not None}
-            obj.clear()
-            obj.update(filtered)
-
-            existing_users.append(obj)
+            existing_users[user] = dict((k, v) for k, v in obj.items() if v is not None)
 
         return existing_users
 
+    def generate_existing_users(self):
+        return list(self.index_existing_users().values())
+
     def filter_users(self):
         want = self.__new_users
         for user in want:
             if 'sshkey' in user:
                 user['sshkey'] = self.calculate_fingerprint(user['sshkey'])
 
-        have = self.generate_existing_users()
-        filtered_users = [x for x in want if x not in have]
+        have = self.index_existing_users()
+        filtered_users = [x for x in want if have.get(x.get('name')) != x]
 
         changed = True if len(filtered_users) > 0 else False
 
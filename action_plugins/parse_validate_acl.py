@@ -22,17 +22,25 @@ import os
 import time
 import re
 import hashlib
-import netaddr
 import json
 import socket
+import sys
 
 from ansible.module_utils._text import to_bytes, to_text
+from ansible.module_utils.parsing.convert_bool import boolean
 from ansible.module_utils.connection import Connection
 from ansible.errors import AnsibleError
 from ansible.plugins.action import ActionBase
 from ansible.module_utils.six.moves.urllib.parse import urlsplit
 from ansible.utils.path import unfrackpath
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'lib'))
+
+from cisco_ios.acl import (ANY_RANGE, AddressError, find_discrepancies, int_to_ip, ip_to_int, is_contiguous_wildcard,
+                           network_range, port_intervals, service_port, wildcard_prefix_length)
+from cisco_ios.parsers.show_ip_access_lists import parse as parse_access_lists
+from cisco_ios.textfsm_templates import TemplateError, iter_rows
+
 try:
     from __main__ import display
 except ImportError:
@@ -40,6 +48,25 @@ except ImportError:
     display = Display()
 
 
+# textfsm values used to build the flows, mapped to the flow key and the
+# kind of value
+ACE_FIELDS = {
+    'LINE_NUM': ('service_line_index', 'value'),
+    'PROTOCOL': ('proto', 'value'),
+    'ACTION': ('action', 'value'),
+    'SRC_NETWORK': ('src', 'network'),
+    'SRC_ANY': ('src', 'any'),
+    'SRC_HOST': ('src', 'host'),
+    'SRC_PORT': ('src_port', 'port'),
+    'DST_NETWORK': ('dst', 'network'),
+    'DST_ANY': ('dst', 'any'),
+    'DST_HOST': ('dst', 'host'),
+    'DST_PORT': ('dst_port', 'port'),
+}
+
+INDEX_VERSION = 1
+
+
 class ActionModule(ActionBase):
 
     def run(self, tmp=None, task_vars=None):
@@ -50,10 +77,7 @@ class ActionModule(ActionBase):
         except KeyError as exc:
             return {'failed': True, 'msg': 'missing required argument: %s' % exc}
 
-        try:
-            parser = self._task.args.get('parser')
-        except KeyError as exc:
-            return {'failed': True, 'msg': 'missing required argument: %s' % exc}
+        parser = self._task.args.get('parser')
 
         try:
             generated_flow_file = self._task.args.get('generated_flow_file')
@@ -63,18 +87,54 @@ class ActionModule(ActionBase):
         generated_flow_file = unfrackpath(generated_flow_file)
         dest = generated_flow_file
 
-        parser = unfrackpath(parser)
-        if not os.path.exists(parser):
-            return {'failed': True, 'msg': 'path: %s does not exist.' % parser}
+        if parser:
+            parser = unfrackpath(parser)
+            if not os.path.exists(parser):
+                return {'failed': True, 'msg': 'path: %s does not exist.' % parser}
         parser_file = parser
 
-        pd_json = self._parse_acl_with_textfsm(
-            parser_file, show_acl_output_buffer)
-        try:
-            changed = self._write_packet_dict(dest, pd_json)
-        except IOError as exc:
-            result['failed'] = True
-            result['msg'] = ('Exception received : %s' % exc)
+        input_digest = self._input_digest(show_acl_output_buffer, parser_file)
+        index = self._read_index(dest)
+
+        if index.get('input') == input_digest and self._index_matches_dest(index, dest):
+            # the acl and parser are unchanged and the flow file has not been
+            # modified since it was generated, nothing to do
+            display.vvv('parse_validate_acl: %s is up to date' % dest)
+            pd_json = None
+            discrepancies = index.get('discrepancies', [])
+        else:
+            try:
+                if parser_file:
+                    pd_json = self._parse_acl_with_textfsm(
+                        parser_file, show_acl_output_buffer)
+                else:
+                    pd_json = self._create_packet_dict(show_acl_output_buffer)
+            except (AddressError, TemplateError, ValueError, socket.error) as exc:
+                return {'failed': True, 'msg': 'unable to parse acl: %s' % to_text(exc)}
+            discrepancies = find_discrepancies(self._parsed_acl)
+
+        result['discrepancies'] = discrepancies
+        if discrepancies:
+            msg = ('acl has %d shadowed, redundant or unreachable entries'
+                   % len(discrepancies))
+            if boolean(self._task.args.get('fail_on_discrepancy', False), strict=False):
+                result.update({'failed': True, 'msg': msg})
+                return result
+            display.warning(msg)
+
+        changed = False
+        if pd_json is not None:
+            output_digest = self._digest(pd_json)
+            try:
+                if index.get('output') == output_digest and self._index_matches_dest(index, dest):
+                    changed = False
+                else:
+                    changed = self._write_packet_dict(dest, pd_json)
+                self._write_index(dest, {'input': input_digest, 'output': output_digest,
+                                         'discrepancies': discrepancies})
+            except (IOError, OSError) as exc:
+                result['failed'] = True
+                result['msg'] = ('Exception received : %s' % exc)
 
         result['changed'] = changed
         if changed:
@@ -84,66 +144,59 @@ class ActionModule(ActionBase):
 
         return result
 
-    def _create_packet_dict(self, cmd_out):
-        import warnings
-        with warnings.catch_warnings(record=True):
-            warnings.simplefilter("always")
-            from trigger.acl import parse
-        import netaddr
-        import json
-        import uuid
-
-        # pd is list of dictionary of packets
-        pd = []
-        lines = cmd_out.split('\n')
-        for index, line in enumerate(lines):
-            line = to_bytes(line, errors='surrogate_or_strict')
-            pd_it = {}
-            try:
-                p = parse(line)
-            except Exception:
-                continue
-
-            if p.terms:
-                match = p.terms[0].match
-                for key in match:
-                    if key == 'source-address':
-                        for m in match["source-address"]:
-                            v = netaddr.IPNetwork(str(m))
-                            # Return the host in middle of subnet
-                            size_subnet = v.size
-                            host_index = int(size_subnet / 2)
-                            pd_it["src"] = str(v[host_index])
-                    if key == 'destination-address':
-                        for m in match["destination-address"]:
-                            v = netaddr.IPNetwork(str(m))
-                            # Return the host in middle of subnet
-                            size_subnet = v.size
-                            host_index = int(size_subnet / 2)
-                            pd_it["dst"] = str(v[host_index])
-                    if key == 'protocol':
-                        for m in match['protocol']:
-                            pd_it["proto"] = str(m)
-                    if key == 'destination-port':
-                        for m in match["destination-port"]:
-                            pd_it['dst_port'] = str(m)
-                    if key == 'source-port':
-                        for m in match["source-port"]:
-                            pd_it['src_port'] = str(m)
-
-                action = p.terms[0].action
-                for act in action:
-                    pd_it["action"] = act
-
-            if pd_it is not None:
-                if "dst" not in pd_it:
-                    pd_it["dst"] = "any"
-                if "src" not in pd_it:
-                    pd_it["src"] = "any"
-                pd_it["service_line_index"] = str(index)
-                pd.append(pd_it)
+    def _digest(self, contents):
+        return hashlib.sha1(to_bytes(contents, errors='surrogate_or_strict')).hexdigest()
 
-        return json.dumps(pd, indent=4)
+    def _input_digest(self, buffer, parser_file):
+        """ Returns the digest of the acl output and the parser used """
+        sha1 = hashlib.sha1()
+        sha1.update(to_bytes('%d\n' % INDEX_VERSION))
+        sha1.update(to_bytes(buffer, errors='surrogate_or_strict'))
+        if parser_file:
+            with open(parser_file, 'rb') as f:
+                sha1.update(f.read())
+        else:
+            sha1.update(b'native')
+        return sha1.hexdigest()
+
+    def _index_path(self, dest):
+        return '%s.index' % dest
+
+    def _read_index(self, dest):
+        """ Returns the sidecar index of the flow file
+
+        The index records the digest of the acl output and parser used to
+        generate the flow file, the digest of the flow file and its size and
+        modification time when it was written.
+        """
+        try:
+            with open(self._index_path(dest)) as f:
+                index = json.load(f)
+        except (IOError, ValueError):
+            return {}
+        return index if index.get('version') == INDEX_VERSION else {}
+
+    def _write_index(self, dest, index):
+        stat = os.stat(dest)
+        index.update({'version': INDEX_VERSION, 'size': stat.st_size, 'mtime': stat.st_mtime})
+        with open(self._index_path(dest), 'w') as f:
+            json.dump(index, f)
+
+    def _index_matches_dest(self, index, dest):
+        """ Returns True if dest is still the file recorded in the index """
+        try:
+            stat = os.stat(dest)
+        except OSError:
+            return False
+        return index.get('size') == stat.st_size and index.get('mtime') == stat.st_mtime
+
+    def _create_packet_dict(self, cmd_out):
+        header, results, unparsed = parse_access_lists(cmd_out)
+        for line in unparsed:
+            display.vvv('parse_validate_acl: unable to parse line: %s' % line)
+        if unparsed:
+            display.warning('%d lines of the acl output could not be parsed' % len(unparsed))
+        return self._build_packet_dict(header, results)
 
     def _write_packet_dict(self, dest, contents):
         # Check for Idempotency
@@ -174,89 +227,100 @@ class ActionModule(ActionBase):
         return (True)
 
     def _parse_acl_with_textfsm(self, parser_file, output):
-        import textfsm
-        tmp = open(parser_file)
-        re_table = textfsm.TextFSM(tmp)
-        results = re_table.ParseText(output)
-        fsm_results = []
-        for item in results:
-            facts = {}
-            facts.update(dict(zip(re_table.header, item)))
-            fsm_results.append(facts)
+        # the rows are built into flows as they are parsed
+        header, rows = iter_rows(parser_file, output)
+        return self._build_packet_dict(header, rows)
+
+    def _build_packet_dict(self, header, results):
+        fields = [(pos, name) for pos, name in enumerate(header) if name in ACE_FIELDS]
+        wildcards = dict((name, header.index(name)) for name in ('SRC_WILDCARD', 'DST_WILDCARD')
+                         if name in header)
+        columns = dict((name, pos) for pos, name in enumerate(header))
 
         pd = []
         parsed_acl = []
-        # Convert dictionary of terms into flows dictionary
-        for term in fsm_results:
+        networks = []
+        # Convert rows of terms into flows dictionary, the addresses of
+        # entries that match a network are resolved below in one batch
+        for row in results:
             pd_it = {}
             original_terms = {}
-            for k, v in term.items():
-                if k == 'LINE_NUM' and v == '':
-                    # Empty line with just name
+            for pos, name in fields:
+                v = row[pos]
+                if v == '':
                     continue
-                elif k == 'LINE_NUM' and v != '':
-                    pd_it["service_line_index"] = v
-                    original_terms["service_line_index"] = v
-                if k == 'PROTOCOL' and v != '':
-                    pd_it["proto"] = v
-                    original_terms['proto'] = v
-                if k == 'ACTION' and v != '':
-                    pd_it["action"] = v
-                    original_terms['action'] = v
-                if k == 'SRC_NETWORK' and v != '':
-                    if 'SRC_WILDCARD' in term:
-                        src_mask = term['SRC_WILDCARD']
-                        src_invert_mask = sum([bin(255 - int(x)).count("1") for x in
-                                              src_mask.split(".")])
-                    else:
-                        src_invert_mask = '32'
-                    cidr = "%s/%s" % (v, src_invert_mask)
-                    src_ip = netaddr.IPNetwork(cidr)
-                    size_subnet = src_ip.size
-                    host_index = int(size_subnet / 2)
-                    pd_it['src'] = str(src_ip[host_index])
-                    original_terms['src'] = src_ip
-                if k == 'SRC_ANY' and v != '':
-                    pd_it['src'] = "any"
-                    original_terms['src'] = netaddr.IPNetwork('0.0.0.0/0')
-                if k == 'SRC_HOST' and v != '':
-                    pd_it['src'] = v
-                    original_terms['src'] = v
-                if k == 'SRC_PORT' and v != '':
-                    if not v[0].isdigit():
-                        v = str(socket.getservbyname(v))
-                    pd_it['src_port'] = v
-                    original_terms['src_port'] = v
-                if k == 'DST_NETWORK' and v != '':
-                    if 'DST_WILDCARD' in term:
-                        dst_mask = term['DST_WILDCARD']
-                        dst_invert_mask = sum([bin(255 - int(x)).count("1") for x in
-                                              dst_mask.split(".")])
-                    else:
-                        dst_invert_mask = '32'
-                    d_cidr = "%s/%s" % (v, dst_invert_mask)
-                    dst_ip = netaddr.IPNetwork(d_cidr)
-                    d_size_subnet = dst_ip.size
-                    d_host_index = int(d_size_subnet / 2)
-                    pd_it['dst'] = str(dst_ip[d_host_index])
-                    original_terms['dst'] = dst_ip
-                if k == 'DST_ANY' and v != '':
-                    pd_it['dst'] = "any"
-                    original_terms['dst'] = netaddr.IPNetwork('0.0.0.0/0')
-                if k == 'DST_HOST' and v != '':
-                    pd_it['dst'] = v
-                    original_terms['dst'] = v
-                if k == 'DST_PORT' and v != '':
-                    if not v[0].isdigit():
-                        v = str(socket.getservbyname(v))
-                    pd_it['dst_port'] = v
-                    original_terms['dst_port'] = v
+                key, kind = ACE_FIELDS[name]
+                if kind == 'network':
+                    wildcard_pos = wildcards.get('%s_WILDCARD' % name.split('_')[0])
+                    wildcard = row[wildcard_pos] if wildcard_pos is not None else None
+                    # reserve the key so the flow keys keep their order
+                    pd_it[key] = None
+                    original_terms[key] = None
+                    networks.append((pd_it, original_terms, key, v, wildcard))
+                elif kind == 'any':
+                    pd_it[key] = 'any'
+                    original_terms[key] = ANY_RANGE
+                elif kind == 'host':
+                    pd_it[key] = v
+                    try:
+                        host = ip_to_int(v)
+                        original_terms[key] = (host, host)
+                    except AddressError:
+                        original_terms[key] = v
+                elif kind == 'port':
+                    v = service_port(v)
+                    pd_it[key] = v
+                    original_terms[key] = v
+                else:
+                    pd_it[key] = v
+                    original_terms[key] = v
 
             if pd_it:
                 pd.append(pd_it)
             if original_terms:
+                original_terms.update(self._match_terms(row, columns))
                 parsed_acl.append(original_terms)
 
-        # Store parsed acl on this object for later processing
+        lengths = [32 if wildcard is None else wildcard_prefix_length(wildcard)
+                   for _, _, _, _, wildcard in networks]
+        ranges = [network_range(address, length)
+                  for (_, _, _, address, _), length in zip(networks, lengths)]
+        # Return the host in middle of subnet
+        hosts = [int_to_ip(first + ((1 << (32 - length)) >> 1))
+                 for (first, _), length in zip(ranges, lengths)]
+
+        for (pd_it, original_terms, key, address, wildcard), host, network in zip(networks, hosts, ranges):
+            pd_it[key] = host
+            if wildcard is None or is_contiguous_wildcard(wildcard):
+                original_terms[key] = network
+            else:
+                # the addresses do not form a network, the entry is not
+                # analyzed for discrepancies
+                original_terms[key] = '%s %s' % (address, wildcard)
+
+        # Store parsed acl on this object for later processing, addresses
+        # are stored as (first, last) integer ranges
         self._parsed_acl = parsed_acl
         return json.dumps(pd, indent=4)
+
+    def _match_terms(self, row, columns):
+        """ Returns the acl name, port intervals and qualifiers of a row """
+        def value(name):
+            pos = columns.get(name)
+            return row[pos] if pos is not None else ''
+
+        terms = {
+            'acl': value('ACL_NAME'),
+            'qualified': bool(value('TCP_FLAG') or value('TIME'))
+        }
+        for direction in ('SRC', 'DST'):
+            try:
+                ports = port_intervals(
+                    value('%s_PORT_MATCH' % direction), value('%s_PORT' % direction),
+                    value('%s_PORT_RANGE_START' % direction), value('%s_PORT_RANGE_END' % direction)
+                )
+            except (ValueError, socket.error):
+                # entries with ports that can not be resolved are not analyzed
+                ports = None
+            terms['%s_ports' % direction.lower()] = ports
+        return terms
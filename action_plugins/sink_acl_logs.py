@@ -0,0 +1,293 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'network'}
+
+DOCUMENTATION = """
+---
+module: sink_acl_logs
+author: Ansible Network Team
+short_description: collect the flows logged by the sink access-list
+description:
+  - Polls the device log buffer for access-list log messages and
+    aggregates the logged flows.  Only log messages that have not been
+    consumed by a previous run are parsed.  The last consumed log sequence
+    number (or last log line when C(service sequence-numbers) is not
+    configured) is stored on the controller for each host.
+  - Polling stops as soon as a poll does not return any new log messages
+    after flows have been seen, or when C(timeout) expires.
+  - The new flows are merged into the flows already in C(dest), adding up
+    the packets of flows seen before, so C(dest) always holds every flow
+    logged since the log buffer was last cleared.  On the first run, or
+    when the previous position is no longer in the log buffer, C(dest) is
+    replaced with the flows in the buffer.
+version_added: "2.7"
+options:
+  dest:
+    description:
+      - Path on the controller to write the aggregated flows to as JSON.
+    required: yes
+  command:
+    description:
+      - The command used to read the log buffer.
+    default: show logging | include permitted
+  timeout:
+    description:
+      - Maximum number of seconds to wait for log messages.
+    default: 10
+  interval:
+    description:
+      - Number of seconds to wait between polls of the log buffer.
+    default: 1
+  content:
+    description:
+      - The output of C(command) collected by another task.  The device is
+        not polled when it is set.
+"""
+
+EXAMPLES = """
+- name: collect flows logged by the sink access-list
+  sink_acl_logs:
+    dest: "{{ sink_path_flow_output }}"
+"""
+
+RETURN = """
+ansible_facts:
+  description: the aggregated flows as C(flows_dict)
+  returned: always
+  type: dict
+consumed:
+  description: the number of new log lines consumed
+  returned: always
+  type: int
+"""
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+
+from collections import OrderedDict
+
+from ansible.plugins.action import ActionBase
+from ansible.module_utils._text import to_text
+from ansible.module_utils.connection import Connection, ConnectionError
+from ansible.errors import AnsibleError
+from ansible.utils.path import unfrackpath
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), 'lib'))
+
+from cisco_ios.utils import get_cache_dir
+
+try:
+    from __main__ import display
+except ImportError:
+    from ansible.utils.display import Display
+    display = Display()
+
+
+# same expression as parser_templates/net_operations/show_logs_acl_logs.yaml
+ACL_LOG_RE = re.compile(r'^.*permitted (\S+) (\d+.\d+.\d+.\d+)\((\d+)\)(?:\s|-|>)*(\d+.\d+.\d+.\d+)\((\d+)\), (\d+) packet')
+SEQUENCE_RE = re.compile(r'^\s*(\d+):\s')
+
+# the fields that identify a flow
+FLOW_KEYS = ('proto', 'src', 'src_port', 'dst', 'dst_port')
+
+
+class ActionModule(ActionBase):
+
+    def run(self, tmp=None, task_vars=None):
+        ''' handler for sink_acl_logs '''
+
+        if task_vars is None:
+            task_vars = dict()
+
+        result = super(ActionModule, self).run(tmp, task_vars)
+        del tmp  # tmp no longer has any effect
+
+        try:
+            dest = unfrackpath(self._task.args['dest'])
+        except KeyError as exc:
+            raise AnsibleError('missing required argument: %s' % exc)
+
+        command = self._task.args.get('command') or 'show logging | include permitted'
+        timeout = float(self._task.args.get('timeout', 10))
+        interval = float(self._task.args.get('interval', 1))
+
+        content = self._task.args.get('content')
+        connection = None
+        if content is None:
+            socket_path = getattr(self._connection, 'socket_path', None) or task_vars.get('ansible_socket')
+            if not socket_path:
+                raise AnsibleError('sink_acl_logs requires a persistent connection, '
+                                   'please use connection type network_cli')
+            connection = Connection(socket_path)
+
+        state_path = os.path.join(get_cache_dir('acl_logs'), '%s.json' % task_vars.get('inventory_hostname', 'localhost'))
+        state = self._load_state(state_path)
+        # the flows in dest are only kept when the log buffer still holds the
+        # position consumed by the previous run
+        resumed = True
+
+        flows = {}
+        consumed = 0
+        deadline = time.time() + timeout
+        while True:
+            if connection is None:
+                output = content
+            else:
+                try:
+                    output = connection.run_commands(commands=[command])[0]
+                except ConnectionError as exc:
+                    return {'failed': True, 'msg': to_text(exc)}
+
+            lines, found = self._new_lines(to_text(output).splitlines(), state)
+            resumed = resumed and found
+            consumed += len(lines)
+            self._aggregate(lines, flows)
+
+            if connection is None or (flows and not lines) or time.time() + interval > deadline:
+                break
+            time.sleep(interval)
+
+        display.vvv('sink_acl_logs: consumed %d log lines, %d flows' % (consumed, len(flows)))
+
+        new_flows = sorted(flows.values(), key=lambda x: x['_index'])
+        for flow in new_flows:
+            del flow['_index']
+
+        flows_dict = self._merge(self._read_flows(dest) if resumed else [], new_flows)
+        for flow in flows_dict:
+            flow['num_packets'] = str(flow['num_packets'])
+
+        try:
+            changed = self._write_flows(dest, flows_dict)
+        except IOError as exc:
+            return {'failed': True, 'msg': 'unable to write %s: %s' % (dest, to_text(exc))}
+
+        self._save_state(state_path, state)
+
+        result.update({
+            'changed': changed,
+            'ansible_facts': {'flows_dict': flows_dict},
+            'consumed': consumed
+        })
+        return result
+
+    def _new_lines(self, lines, state):
+        """ Returns the lines that have not been consumed yet and whether the
+        previous position was found
+
+        Log messages are identified by their sequence number when the
+        device has service sequence-numbers configured.  Otherwise all of
+        the lines after the last line consumed are returned.  When the
+        previous position can not be found in the buffer (the buffer was
+        cleared or the device reloaded) all of the lines are new.
+        """
+        lines = [line for line in lines if line.strip()]
+        if not lines:
+            return lines, bool(state)
+
+        sequenced = list()
+        for line in lines:
+            match = SEQUENCE_RE.match(line)
+            if match:
+                sequenced.append((int(match.group(1)), line))
+
+        last_seq = state.get('sequence')
+        new = lines
+        found = False
+
+        if sequenced:
+            newest = max(seq for seq, line in sequenced)
+            if last_seq is not None and newest >= last_seq:
+                new = [line for seq, line in sequenced if seq > last_seq]
+                found = True
+            else:
+                new = [line for seq, line in sequenced]
+            state['sequence'] = newest
+        else:
+            last_line = state.get('last_line')
+            if last_line is not None:
+                for index in range(len(lines) - 1, -1, -1):
+                    if lines[index] == last_line:
+                        new = lines[index + 1:]
+                        found = True
+                        break
+            state.pop('sequence', None)
+
+        state['last_line'] = lines[-1]
+        return new, found
+
+    def _aggregate(self, lines, flows):
+        for line in lines:
+            match = ACL_LOG_RE.match(line)
+            if not match:
+                continue
+            proto, src, src_port, dst, dst_port, num_packets = match.groups()
+            key = (proto, src, src_port, dst, dst_port)
+            flow = flows.get(key)
+            if flow is None:
+                flows[key] = {'proto': proto, 'src': src, 'src_port': src_port,
+                              'dst': dst, 'dst_port': dst_port,
+                              'num_packets': int(num_packets), '_index': len(flows)}
+            else:
+                flow['num_packets'] += int(num_packets)
+
+    def _read_flows(self, dest):
+        try:
+            with open(dest) as f:
+                flows = json.load(f)
+        except (IOError, ValueError):
+            return []
+        return flows if isinstance(flows, list) else []
+
+    def _merge(self, flows, new_flows):
+        """ Returns flows with the packets of new_flows added, new flows last """
+        merged = OrderedDict()
+        for flow in flows + new_flows:
+            key = tuple(flow.get(name) for name in FLOW_KEYS)
+            if key in merged:
+                merged[key]['num_packets'] = int(merged[key]['num_packets']) + int(flow['num_packets'])
+            else:
+                merged[key] = dict(flow)
+        return list(merged.values())
+
+    def _write_flows(self, dest, flows):
+        # same format as the to_nice_json filter
+        content = json.dumps(flows, indent=4, sort_keys=True, separators=(',', ': '))
+        if os.path.exists(dest):
+            with open(dest) as f:
+                if f.read() == content:
+                    return False
+        with open(dest, 'w') as f:
+            f.write(content)
+        return True
+
+    def _load_state(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def _save_state(self, path, state):
+        # the state is replaced in one step so a run that is interrupted
+        # never leaves a truncated state behind
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(state, f)
+            os.rename(tmp, path)
+        except Exception:
+            os.remove(tmp)
+            raise
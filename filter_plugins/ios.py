@@ -10,25 +10,188 @@ __metaclass__ = type
 
 import re
 
+from collections import OrderedDict
 
-INTERFACE_NAMES = {
-    'Gi': 'GigabitEthernet',
-}
+from ansible.module_utils.six import string_types
+from ansible.module_utils._text import to_text
+
+
+# full interface name -> abbreviations used by IOS in show command output,
+# the first abbreviation is the one used when shortening names
+INTERFACE_NAMES = OrderedDict([
+    ('AppGigabitEthernet', ('Ap',)),
+    ('ATM', ('AT',)),
+    ('BDI', ('BD',)),
+    ('BRI', ('BR',)),
+    ('Bluetooth', ('Bl',)),
+    ('Cellular', ('Ce',)),
+    ('Dialer', ('Di',)),
+    ('Embedded-Service-Engine', ('Em',)),
+    ('Ethernet', ('Et', 'Eth')),
+    ('FastEthernet', ('Fa',)),
+    ('FiveGigabitEthernet', ('Fi',)),
+    ('FortyGigabitEthernet', ('Fo',)),
+    ('GigabitEthernet', ('Gi', 'Gig')),
+    ('HundredGigE', ('Hu',)),
+    ('Loopback', ('Lo',)),
+    ('Multilink', ('Mu',)),
+    ('NVI', ('NV',)),
+    ('Null', ('Nu',)),
+    ('Port-channel', ('Po',)),
+    ('POS', ('POS',)),
+    ('Serial', ('Se',)),
+    ('TenGigabitEthernet', ('Te',)),
+    ('Tunnel', ('Tu',)),
+    ('TwentyFiveGigE', ('Twe',)),
+    ('TwoGigabitEthernet', ('Tw',)),
+    ('Virtual-Access', ('Vi',)),
+    ('Virtual-Template', ('Vt',)),
+    ('VirtualPortGroup', ('VP',)),
+    ('Vlan', ('Vl',)),
+    ('Wlan-GigabitEthernet', ('Wl',)),
+])
+
+# the number of names kept by each of the name caches
+CACHE_SIZE = 4096
+
+INTERFACE_RE = re.compile(r'([a-zA-Z][a-zA-Z-]*)\s*(\d.*)$')
+
+
+def _build_name_index():
+    """ Returns a map of the names that identify an interface type
+
+    Only the abbreviations in the table and the full names are indexed.
+    IOS accepts any unambiguous prefix on the command line, but indexing
+    every prefix turns names that are not interfaces, such as `eth0` or
+    `Port 1`, into interface names.  The abbreviations must match exactly,
+    the full names are matched regardless of case.
+    """
+    index = dict()
+    for name, abbreviations in INTERFACE_NAMES.items():
+        # the abbreviations are capitalized so they never clash with the
+        # lowercase full names
+        index[name.lower()] = name
+        for abbreviation in abbreviations:
+            index[abbreviation] = name
+    return index
+
+
+NAME_INDEX = _build_name_index()
+SHORT_NAMES = dict((name, abbreviations[0]) for name, abbreviations in INTERFACE_NAMES.items())
+
+
+class LRUCache(object):
+    """ Bounded cache that discards the least recently used entry """
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+
+    def get(self, key):
+        value = self.entries.pop(key, None)
+        if value is not None:
+            self.entries[key] = value
+        return value
+
+    def set(self, key, value):
+        self.entries[key] = value
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+
+_EXPANDED = LRUCache(CACHE_SIZE)
+_SHORTENED = LRUCache(CACHE_SIZE)
+
+
+def _split(name):
+    """ Returns the full type and the number of an interface name
+
+    The type is None when the name is not a known interface name.
+    """
+    match = INTERFACE_RE.match(name)
+    if not match:
+        return None, name
+    interface_type = match.group(1)
+    return NAME_INDEX.get(interface_type) or NAME_INDEX.get(interface_type.lower()), match.group(2)
 
 
 def expand_interface_name(name):
-    match = re.match('([a-zA-Z]*)', name)
-    if match and match.group(1) in INTERFACE_NAMES:
-        matched = match.group(1)
-        name = name.replace(matched, INTERFACE_NAMES[matched])
-    return name
+    """ Returns the full interface name of an abbreviated interface name
+
+    Names that are not interface names are returned unchanged.
+    """
+    if not isinstance(name, string_types):
+        return name
+    expanded = _EXPANDED.get(name)
+    if expanded is None:
+        interface_type, number = _split(to_text(name))
+        expanded = interface_type + number if interface_type else name
+        _EXPANDED.set(name, expanded)
+    return expanded
+
+
+def shorten_interface_name(name):
+    """ Returns the abbreviated interface name of an interface name
+
+    Names that are not interface names are returned unchanged.
+    """
+    if not isinstance(name, string_types):
+        return name
+    shortened = _SHORTENED.get(name)
+    if shortened is None:
+        interface_type, number = _split(to_text(name))
+        shortened = SHORT_NAMES[interface_type] + number if interface_type else name
+        _SHORTENED.set(name, shortened)
+    return shortened
+
+
+def expand_interface_names(names):
+    """ Returns the list of names with every interface name expanded """
+    return [expand_interface_name(name) for name in names]
+
+
+def shorten_interface_names(names):
+    """ Returns the list of names with every interface name abbreviated """
+    return [shorten_interface_name(name) for name in names]
+
+
+def _convert_keys(data, convert, recursive):
+    if isinstance(data, dict):
+        return dict((convert(key), _convert_keys(value, convert, recursive) if recursive else value)
+                    for key, value in data.items())
+    if recursive and isinstance(data, list):
+        return [_convert_keys(item, convert, recursive) for item in data]
+    return data
+
+
+def expand_interface_keys(data, recursive=False):
+    """ Returns data with every interface name used as a key expanded
+
+    With recursive the keys of nested dicts, including dicts in lists, are
+    expanded as well.
+    """
+    return _convert_keys(data, expand_interface_name, recursive)
+
+
+def shorten_interface_keys(data, recursive=False):
+    """ Returns data with every interface name used as a key abbreviated
+
+    With recursive the keys of nested dicts, including dicts in lists, are
+    abbreviated as well.
+    """
+    return _convert_keys(data, shorten_interface_name, recursive)
 
 
 class FilterModule(object):
     """Filters for working with output from network devices"""
 
     filter_map = {
-        'expand_interface_name': expand_interface_name
+        'expand_interface_name': expand_interface_name,
+        'expand_interface_names': expand_interface_names,
+        'expand_interface_keys': expand_interface_keys,
+        'shorten_interface_name': shorten_interface_name,
+        'shorten_interface_names': shorten_interface_names,
+        'shorten_interface_keys': shorten_interface_keys,
     }
 
     def filters(self):
@@ -0,0 +1,357 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Helpers for working with IPv4 access-list entries as integers
+
+Addresses and wildcard masks are converted to integers once so that the
+networks matched by a large number of access-list entries can be computed
+with plain integer operations instead of building an address object for
+every entry.  Wildcard and service name lookups are memoized since the
+same handful of values repeat across most access-lists.
+"""
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import socket
+
+
+MAX_ADDRESS = 0xffffffff
+ANY_RANGE = (0, MAX_ADDRESS)
+
+# prefix length to netmask
+NETMASKS = [(MAX_ADDRESS << (32 - length)) & MAX_ADDRESS for length in range(33)]
+
+_PREFIX_LENGTHS = {}
+_CONTIGUOUS = {}
+_SERVICE_PORTS = {}
+
+
+class AddressError(ValueError):
+    pass
+
+
+def ip_to_int(address):
+    """ Converts a dotted quad IPv4 address to an integer """
+    try:
+        octets = [int(x) for x in address.split('.')]
+    except ValueError:
+        octets = None
+    if not octets or len(octets) != 4 or any(x < 0 or x > 255 for x in octets):
+        raise AddressError('invalid IPv4 address: %s' % address)
+    return (octets[0] << 24) | (octets[1] << 16) | (octets[2] << 8) | octets[3]
+
+
+def int_to_ip(value):
+    """ Converts an integer to a dotted quad IPv4 address """
+    return '%d.%d.%d.%d' % (value >> 24, (value >> 16) & 255, (value >> 8) & 255, value & 255)
+
+
+def wildcard_prefix_length(wildcard):
+    """ Returns the prefix length for a wildcard mask
+
+    The prefix length is the number of bits that are not set in the
+    wildcard.  Lookups are memoized by the wildcard string.
+    """
+    try:
+        return _PREFIX_LENGTHS[wildcard]
+    except KeyError:
+        length = sum([bin(255 - int(x)).count('1') for x in wildcard.split('.')])
+        if not 0 <= length <= 32:
+            raise AddressError('invalid wildcard mask: %s' % wildcard)
+        _PREFIX_LENGTHS[wildcard] = length
+        return length
+
+
+def is_contiguous_wildcard(wildcard):
+    """ Returns True if the wildcard mask matches a network prefix
+
+    A wildcard such as 0.0.255.0 matches addresses that do not form a
+    single network, the bits that are set must all be trailing bits.
+    Lookups are memoized by the wildcard string.
+    """
+    try:
+        return _CONTIGUOUS[wildcard]
+    except KeyError:
+        value = ip_to_int(wildcard)
+        contiguous = _CONTIGUOUS[wildcard] = value & (value + 1) == 0
+        return contiguous
+
+
+def network_range(address, length):
+    """ Returns the first and last address of the network as integers """
+    mask = NETMASKS[length]
+    first = ip_to_int(address) & mask
+    return first, first | (~mask & MAX_ADDRESS)
+
+
+def service_port(name):
+    """ Returns the port number for the service name as a string
+
+    Port numbers are returned unchanged.  Lookups of service names are
+    memoized, socket.error is raised for unknown services.
+    """
+    if name[0].isdigit():
+        return name
+    try:
+        return _SERVICE_PORTS[name]
+    except KeyError:
+        port = _SERVICE_PORTS[name] = str(socket.getservbyname(name))
+        return port
+
+
+MAX_PORT = 65535
+ALL_PORTS = ((0, MAX_PORT),)
+NO_PORTS = ()
+
+PORT_PROTOCOLS = frozenset(['tcp', 'udp'])
+
+
+def port_intervals(operator, port=None, start=None, end=None):
+    """ Returns the ports matched by a port operator as sorted intervals
+
+    Service names are resolved with service_port.  An entry without an
+    operator matches all ports, an empty tuple is returned when the
+    operator can not match any port (such as `lt 0`).
+    """
+    if not operator:
+        return ALL_PORTS
+
+    if operator == 'range':
+        first, last = int(service_port(start)), int(service_port(end))
+        return ((first, last),) if first <= last else NO_PORTS
+
+    ports = sorted(set(int(service_port(p)) for p in port.split()))
+    if operator == 'eq':
+        return _merge_intervals([(p, p) for p in ports])
+    elif operator == 'neq':
+        intervals = list()
+        first = 0
+        for p in ports:
+            if p > first:
+                intervals.append((first, p - 1))
+            first = p + 1
+        if first <= MAX_PORT:
+            intervals.append((first, MAX_PORT))
+        return tuple(intervals)
+    elif operator == 'lt':
+        return ((0, ports[-1] - 1),) if ports[-1] > 0 else NO_PORTS
+    elif operator == 'gt':
+        return ((ports[0] + 1, MAX_PORT),) if ports[0] < MAX_PORT else NO_PORTS
+
+    raise ValueError('unknown port operator: %s' % operator)
+
+
+def _merge_intervals(intervals):
+    merged = list()
+    for first, last in sorted(intervals):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(last, merged[-1][1]))
+        else:
+            merged.append((first, last))
+    return tuple(merged)
+
+
+def covers_intervals(outer, inner):
+    """ Returns True if every interval of inner is inside outer
+
+    Both outer and inner must be sorted, merged interval tuples.
+    """
+    pos = 0
+    for first, last in inner:
+        while pos < len(outer) and outer[pos][1] < first:
+            pos += 1
+        if pos == len(outer) or outer[pos][0] > first or outer[pos][1] < last:
+            return False
+    return True
+
+
+def _overlaps(left, right):
+    return any(a <= d and c <= b for a, b in left for c, d in right)
+
+
+def prefix_length(network):
+    """ Returns the prefix length of a (first, last) network range """
+    return 33 - (network[1] - network[0] + 1).bit_length()
+
+
+class Ace(object):
+    """ An access-list entry prepared for the discrepancy analysis """
+
+    __slots__ = ('index', 'acl', 'line', 'action', 'proto', 'src', 'dst',
+                 'src_key', 'dst_key', 'src_ports', 'dst_ports', 'point', 'qualified')
+
+    def __init__(self, index, terms):
+        self.index = index
+        self.acl = terms.get('acl')
+        self.line = terms.get('service_line_index')
+        self.action = terms.get('action')
+        self.proto = terms.get('proto') or 'ip'
+        self.src = terms.get('src', ANY_RANGE)
+        self.dst = terms.get('dst', ANY_RANGE)
+        # entries that only match part of the packets for their addresses
+        # and ports (tcp flags, time ranges) never cover other entries
+        self.qualified = terms.get('qualified', False)
+
+        if self.proto in PORT_PROTOCOLS:
+            self.src_ports = terms.get('src_ports', ALL_PORTS)
+            self.dst_ports = terms.get('dst_ports', ALL_PORTS)
+        else:
+            self.src_ports = self.dst_ports = ALL_PORTS
+
+        self.src_key = (self.src[0], prefix_length(self.src))
+        self.dst_key = (self.dst[0], prefix_length(self.dst))
+
+        # entries that match a single destination port from any source port
+        # are indexed by (proto, port) instead of being scanned
+        if self.src_ports == ALL_PORTS and len(self.dst_ports) == 1 and \
+                self.dst_ports[0][0] == self.dst_ports[0][1] and self.proto in PORT_PROTOCOLS:
+            self.point = (self.proto, self.dst_ports[0][0])
+        else:
+            self.point = None
+
+    def covers_proto(self, other):
+        return self.proto == 'ip' or self.proto == other.proto
+
+
+class _Bucket(object):
+
+    __slots__ = ('points', 'wide')
+
+    def __init__(self):
+        self.points = {}
+        self.wide = list()
+
+
+def _points_in(points, proto, intervals):
+    """ Returns the single port entries of points inside the port intervals
+
+    The ports of the intervals are looked up one by one when there are fewer
+    of them than entries, otherwise every entry is checked.
+    """
+    count = sum(last - first + 1 for first, last in intervals)
+    if count <= len(points):
+        found = (points.get((proto, port)) for first, last in intervals for port in range(first, last + 1))
+        return [other for other in found if other is not None]
+    return [other for (other_proto, port), other in points.items()
+            if other_proto == proto and any(first <= port <= last for first, last in intervals)]
+
+
+def _analyze(aces):
+    """ Yields the discrepancies found in the entries of a single acl
+
+    Entries are indexed by their (source, destination) prefix pair.  The
+    entries that may cover an entry are found by looking up each of its
+    ancestor prefix pairs, limited to the prefix lengths in use in the acl,
+    rather than comparing it against every earlier entry.  Entries that are
+    already fully covered by an earlier entry are never added to the index.
+    """
+    index = {}
+    src_lengths = set()
+    dst_lengths = set()
+
+    for ace in aces:
+        if not ace.src_ports or not ace.dst_ports:
+            yield ace, 'unreachable', []
+            continue
+
+        covering = None
+        partial = list()
+
+        for src_length in src_lengths:
+            if src_length > ace.src_key[1]:
+                continue
+            src_key = (ace.src[0] & NETMASKS[src_length], src_length)
+            for dst_length in dst_lengths:
+                if dst_length > ace.dst_key[1]:
+                    continue
+                bucket = index.get((src_key, (ace.dst[0] & NETMASKS[dst_length], dst_length)))
+                if bucket is None:
+                    continue
+
+                if len(ace.dst_ports) == 1 and ace.dst_ports[0][0] == ace.dst_ports[0][1]:
+                    other = bucket.points.get((ace.proto, ace.dst_ports[0][0]))
+                    if other is not None and (covering is None or other.index < covering.index):
+                        covering = other
+                elif bucket.points and ace.proto in PORT_PROTOCOLS:
+                    partial.extend(_points_in(bucket.points, ace.proto, ace.dst_ports))
+
+                for other in bucket.wide:
+                    if covering is not None and other.index > covering.index:
+                        break
+                    if not other.covers_proto(ace) or not covers_intervals(other.src_ports, ace.src_ports):
+                        continue
+                    if covers_intervals(other.dst_ports, ace.dst_ports):
+                        covering = other
+                        break
+                    partial.append(other)
+
+        if covering is not None:
+            reason = 'redundant' if covering.action == ace.action else 'shadowed'
+            yield ace, reason, [covering]
+            continue
+
+        if partial:
+            union = _merge_intervals([i for other in partial for i in other.dst_ports])
+            if covers_intervals(union, ace.dst_ports):
+                overlapping = [other for other in partial if _overlaps(other.dst_ports, ace.dst_ports)]
+                yield ace, 'unreachable', sorted(overlapping, key=lambda x: x.index)
+                continue
+
+        if ace.qualified:
+            continue
+
+        bucket = index.get((ace.src_key, ace.dst_key))
+        if bucket is None:
+            bucket = index[(ace.src_key, ace.dst_key)] = _Bucket()
+            src_lengths.add(ace.src_key[1])
+            dst_lengths.add(ace.dst_key[1])
+        if ace.point is not None:
+            bucket.points.setdefault(ace.point, ace)
+        else:
+            bucket.wide.append(ace)
+
+
+def find_discrepancies(parsed_acl):
+    """ Returns the shadowed, redundant and unreachable entries
+
+    parsed_acl is a list of access-list entries as dicts with integer
+    (first, last) address ranges and port intervals.  An entry is
+
+      * shadowed when an earlier entry with a different action matches
+        all of its packets
+      * redundant when an earlier entry with the same action matches all
+        of its packets
+      * unreachable when it can not match any packet, either because its
+        ports are empty or because all of its packets are matched by a
+        combination of earlier entries
+
+    Entries with addresses or ports that could not be converted, including
+    addresses with a non-contiguous wildcard mask, are ignored.
+    """
+    acls = {}
+    order = list()
+    for index, terms in enumerate(parsed_acl):
+        if not all(isinstance(terms.get(key, ANY_RANGE), tuple) for key in ('src', 'dst')):
+            continue
+        if terms.get('src_ports', ALL_PORTS) is None or terms.get('dst_ports', ALL_PORTS) is None:
+            continue
+        ace = Ace(index, terms)
+        if ace.acl not in acls:
+            acls[ace.acl] = list()
+            order.append(ace.acl)
+        acls[ace.acl].append(ace)
+
+    discrepancies = list()
+    for acl in order:
+        for ace, reason, others in _analyze(acls[acl]):
+            discrepancies.append({
+                'acl': acl,
+                'service_line_index': ace.line,
+                'type': reason,
+                'covered_by': [other.line for other in others]
+            })
+    return discrepancies
@@ -0,0 +1,195 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Controller side checkpoint store
+
+Running-config snapshots are stored gzip compressed and addressed by the
+SHA-256 of their content, so a configuration that is the same on several
+devices or across several runs is only stored once.  Each device has an
+index of its snapshots, newest first, that references the snapshots by id.
+
+    <store>/objects/<id[:2]>/<id>.gz
+    <store>/index/<host>.json
+"""
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import gzip
+import hashlib
+import io
+import json
+import os
+import tempfile
+import time
+
+from ansible.module_utils._text import to_bytes, to_text
+
+from cisco_ios.utils import get_cache_dir
+
+
+# lines show running-config adds that are not part of the configuration
+HEADER_PREFIXES = ('Building configuration', 'Current configuration')
+
+# comments that change on every configuration change, removed so that
+# snapshots of the same configuration have the same id
+VOLATILE_PREFIXES = ('! Last configuration change', '! NVRAM config last updated')
+
+
+class CheckpointError(Exception):
+    pass
+
+
+def get_store(path=None):
+    """ Returns the store directory, defaults to the role cache """
+    if path:
+        path = os.path.expanduser(path)
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        return path
+    return get_cache_dir('checkpoints')
+
+
+def _atomic_write(path, data):
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        try:
+            os.makedirs(directory)
+        except OSError:
+            if not os.path.isdir(directory):
+                raise
+    fd, tmp = tempfile.mkstemp(dir=directory)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+    os.rename(tmp, path)
+
+
+def _compress(data):
+    buf = io.BytesIO()
+    # a fixed mtime keeps the compressed snapshot reproducible
+    with gzip.GzipFile(fileobj=buf, mode='wb', mtime=0) as f:
+        f.write(data)
+    return buf.getvalue()
+
+
+def _object_path(store, checkpoint_id):
+    return os.path.join(store, 'objects', checkpoint_id[:2], '%s.gz' % checkpoint_id)
+
+
+def _index_path(store, host):
+    return os.path.join(store, 'index', '%s.json' % host)
+
+
+def normalize(config):
+    """ Returns the config without the show running-config header """
+    lines = to_text(config).splitlines()
+    while lines and (not lines[0].strip() or lines[0].startswith(HEADER_PREFIXES)):
+        lines.pop(0)
+    return '\n'.join(line for line in lines if not line.startswith(VOLATILE_PREFIXES)) + '\n'
+
+
+def read_index(store, host):
+    """ Returns the snapshots of host, newest first """
+    try:
+        with open(_index_path(store, host)) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return []
+
+
+def save(store, host, config, keep=10, raw=False):
+    """ Stores a snapshot of config for host and returns its id
+
+    The snapshot is only written when no device has stored the same
+    configuration before.  Saving the same configuration as the latest
+    snapshot of host does not add a new generation.  Only the newest keep
+    snapshots are kept in the index of host.
+
+    config is normalized unless raw is set, raw snapshots such as a
+    configuration file written by the device are stored byte for byte.
+    """
+    if raw:
+        data = to_bytes(config, errors='surrogate_or_strict')
+    else:
+        data = to_bytes(normalize(config), errors='surrogate_or_strict')
+    checkpoint_id = hashlib.sha256(data).hexdigest()
+
+    path = _object_path(store, checkpoint_id)
+    if not os.path.exists(path):
+        _atomic_write(path, _compress(data))
+
+    index = read_index(store, host)
+    if not index or index[0]['id'] != checkpoint_id:
+        index.insert(0, {'id': checkpoint_id, 'timestamp': int(time.time()), 'size': len(data)})
+        del index[keep:]
+        _atomic_write(_index_path(store, host), to_bytes(json.dumps(index)))
+
+    return checkpoint_id
+
+
+def resolve(store, host, checkpoint=0):
+    """ Returns the id of a snapshot of host
+
+    checkpoint is either the generation of the snapshot, 0 being the newest,
+    or a snapshot id or a unique prefix of one.
+    """
+    index = read_index(store, host)
+    if not index:
+        raise CheckpointError('no checkpoints stored for %s' % host)
+
+    checkpoint = to_text(checkpoint)
+    if checkpoint.isdigit() and len(checkpoint) < 8:
+        generation = int(checkpoint)
+        if generation >= len(index):
+            raise CheckpointError('%s only has %d checkpoints' % (host, len(index)))
+        return index[generation]['id']
+
+    matches = set(entry['id'] for entry in index if entry['id'].startswith(checkpoint))
+    if len(matches) != 1:
+        raise CheckpointError('%s does not match exactly one checkpoint of %s' % (checkpoint, host))
+    return matches.pop()
+
+
+def load(store, checkpoint_id):
+    """ Returns the configuration of a snapshot """
+    try:
+        with gzip.open(_object_path(store, checkpoint_id), 'rb') as f:
+            data = f.read()
+    except (IOError, OSError) as exc:
+        raise CheckpointError('unable to read checkpoint %s: %s' % (checkpoint_id, exc))
+    if hashlib.sha256(data).hexdigest() != checkpoint_id:
+        raise CheckpointError('checkpoint %s is corrupt' % checkpoint_id)
+    return to_text(data, errors='surrogate_or_strict')
+
+
+def export(store, checkpoint_id, dest):
+    """ Writes the configuration of a snapshot to dest """
+    _atomic_write(dest, to_bytes(load(store, checkpoint_id), errors='surrogate_or_strict'))
+
+
+def prune(store):
+    """ Removes the snapshots no device index references anymore
+
+    Returns the number of snapshots removed.  This must not run while
+    snapshots are being saved, a snapshot that was just written may not be
+    referenced by its index yet.
+    """
+    referenced = set()
+    index_dir = os.path.join(store, 'index')
+    if os.path.isdir(index_dir):
+        for name in os.listdir(index_dir):
+            if name.endswith('.json'):
+                referenced.update(entry['id'] for entry in read_index(store, name[:-5]))
+
+    removed = 0
+    objects_dir = os.path.join(store, 'objects')
+    if os.path.isdir(objects_dir):
+        for prefix in os.listdir(objects_dir):
+            for name in os.listdir(os.path.join(objects_dir, prefix)):
+                if name.endswith('.gz') and name[:-3] not in referenced:
+                    os.remove(os.path.join(objects_dir, prefix, name))
+                    removed += 1
+    return removed
@@ -0,0 +1,616 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Compiled parser templates for the command_parser engine
+
+Parser templates are loaded once, turned into a tree of directive objects
+with all literal regular expressions compiled and cached in memory.  The
+loaded YAML source is also cached on disk as JSON, so later runs do not
+need to parse the YAML again.  The caches are keyed by the template path
+and its modification time so any change to the template is picked up on
+the next load.
+
+The CommandParser class runs a compiled template against the output of a
+command and implements the same directives and semantics as the
+command_parser action provided by ansible-network.network-engine.
+"""
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import os
+import re
+import hashlib
+import json
+import tempfile
+
+import yaml
+
+from ansible.errors import AnsibleUndefinedVariable
+from ansible.module_utils.six import iteritems, string_types
+
+from cisco_ios.utils import get_cache_dir, merge_facts
+
+try:
+    from collections.abc import Mapping, Iterable
+except ImportError:
+    from collections import Mapping, Iterable
+
+
+CACHE_VERSION = 2
+
+ACTION_DIRECTIVES = ('parser_metadata', 'pattern_match', 'json_template', 'set_vars', 'export_facts')
+VALID_EXPORT_AS = ('list', 'elements', 'dict', 'object', 'hash')
+
+JINJA_MARKERS = ('{{', '{%', '{#')
+VARIABLE_PATH_RE = re.compile(r'^\{\{\s*([A-Za-z_]\w*(?:\.\w+)*)\s*\}\}$')
+
+_TEMPLATES = {}
+
+
+class ParserError(Exception):
+    pass
+
+
+class UnsupportedDirective(ParserError):
+    pass
+
+
+class Undefined(object):
+    """ Marker returned when a variable path cannot be resolved """
+
+
+UNDEFINED = Undefined()
+FALLBACK = object()
+
+
+def is_template(value):
+    return isinstance(value, string_types) and any(m in value for m in JINJA_MARKERS)
+
+
+class Expression(object):
+    """ A value from the parser template that may need to be templated
+
+    Values that do not contain any template markers are returned as is.
+    Values in the form of `{{ foo.bar.0 }}` are resolved by walking the
+    variables directly and everything else is rendered by the templar.
+    """
+
+    __slots__ = ('value', 'path', 'literal')
+
+    def __init__(self, value):
+        self.value = value
+        self.path = None
+        self.literal = not is_template(value)
+        if not self.literal:
+            match = VARIABLE_PATH_RE.match(value)
+            if match:
+                self.path = tuple(int(p) if p.isdigit() else p for p in match.group(1).split('.'))
+
+
+def compile_value(value):
+    """ Compiles (nested) template arguments into expressions """
+    if isinstance(value, Mapping):
+        return dict((k, compile_value(v)) for k, v in iteritems(value))
+    elif isinstance(value, list):
+        return [compile_value(v) for v in value]
+    return Expression(value)
+
+
+def compile_regex(value):
+    if isinstance(value, Expression) and value.literal:
+        if not isinstance(value.value, string_types):
+            raise ParserError('regex must be a string, got %s' % value.value)
+        return re.compile(value.value, re.M)
+    return value
+
+
+class Directive(object):
+    """ A single (top level or pattern_group) parser directive """
+
+    def __init__(self, task, nested=False):
+        task = dict(task)
+        self.name = task.pop('name', None)
+        self.register = task.pop('register', None)
+        self.when = task.pop('when', None)
+
+        loop = task.pop('loop', None)
+        self.loop = compile_value(loop) if loop is not None else None
+        self.loop_var = (task.pop('loop_control', None) or {}).get('loop_var') or 'item'
+
+        self.extend = task.pop('extend', None)
+        if self.extend is not None:
+            self.extend = compile_value(self.extend)
+        self.export = task.pop('export', False)
+        self.export_as = compile_value(task.pop('export_as', 'list'))
+
+        if 'export_facts' in task:
+            task['set_vars'] = task.pop('export_facts')
+            self.export = True
+
+        if len(task) != 1:
+            raise UnsupportedDirective('expected exactly one directive in task `%s`, got %s'
+                                       % (self.name, ', '.join(task) or 'none'))
+
+        directive, args = list(task.items())[0]
+        if directive == 'block':
+            directive = 'pattern_group'
+
+        if nested and directive not in ('pattern_group', 'pattern_match'):
+            raise UnsupportedDirective('invalid directive `%s` in pattern_group' % directive)
+
+        if directive == 'pattern_group':
+            self.args = [Directive(t, nested=True) for t in args]
+        elif directive == 'pattern_match':
+            self.args = compile_value(args)
+            self.args['regex'] = compile_regex(self.args.get('regex'))
+            if 'match_until' in self.args:
+                self.args['match_until'] = compile_regex(self.args['match_until'])
+        elif directive == 'json_template':
+            self.args = JsonTemplate(args['template'])
+        elif directive in ACTION_DIRECTIVES:
+            self.args = compile_value(args)
+        else:
+            raise UnsupportedDirective('invalid directive in parser: %s' % directive)
+
+        self.directive = directive
+
+
+class JsonTemplate(object):
+    """ Compiled form of the json_template directive """
+
+    def __init__(self, template):
+        self.items = list()
+        for item in template:
+            entry = {
+                'key': compile_value(item['key']),
+                'when': item.get('when'),
+                'repeat_for': compile_value(item['repeat_for']) if 'repeat_for' in item else None,
+                'repeat_var': item.get('repeat_var', 'item'),
+            }
+            if 'value' in item:
+                entry['type'] = 'value'
+                entry['value'] = compile_value(item['value'])
+            elif 'object' in item:
+                entry['type'] = 'object'
+                entry['value'] = JsonTemplate(item['object'])
+            elif 'elements' in item:
+                entry['type'] = 'elements'
+                elements = item['elements']
+                if isinstance(elements, list):
+                    entry['value'] = JsonTemplate(elements)
+                else:
+                    entry['value'] = compile_value(elements)
+            else:
+                raise UnsupportedDirective('json_template entry `%s` requires one of value, '
+                                           'object or elements' % item['key'])
+            self.items.append(entry)
+
+
+class ParserTemplate(object):
+    """ A parser template compiled into a list of directives """
+
+    def __init__(self, path, tasks):
+        self.path = path
+        if not isinstance(tasks, list):
+            raise ParserError('parser template %s must be a list of directives' % path)
+        self.directives = [Directive(task) for task in tasks]
+
+
+def _cache_path(path):
+    digest = hashlib.sha1(path.encode('utf-8')).hexdigest()
+    return os.path.join(get_cache_dir('parser_templates'), '%s.json' % digest)
+
+
+def _read_cache(path, key):
+    """ Returns the cached tasks of the template or None
+
+    The cache only holds the data loaded from the YAML source, stored as
+    JSON so nothing read from the cache directory is ever executed.
+    """
+    try:
+        with open(_cache_path(path)) as f:
+            data = json.load(f)
+    except Exception:
+        return None
+    if data.get('version') != CACHE_VERSION or data.get('path') != path or data.get('key') != list(key):
+        return None
+    return data.get('tasks')
+
+
+def _write_cache(path, key, tasks):
+    try:
+        cache_path = _cache_path(path)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(cache_path))
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'version': CACHE_VERSION, 'path': path, 'key': list(key), 'tasks': tasks}, f)
+        os.rename(tmp_path, cache_path)
+    except Exception:
+        # the disk cache is only an optimization, ignore any errors
+        pass
+
+
+def load_template(path, use_disk_cache=True):
+    """ Returns the compiled parser template for path
+
+    Templates are returned from the in memory cache when the file has not
+    been modified.  Otherwise the tasks are read from the disk cache, or
+    from the YAML source when the disk cache is not valid, and compiled.
+    """
+    path = os.path.realpath(path)
+    stat = os.stat(path)
+    key = (stat.st_mtime, stat.st_size)
+
+    cached = _TEMPLATES.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    tasks = _read_cache(path, key) if use_disk_cache else None
+    if tasks is None:
+        with open(path) as f:
+            tasks = yaml.safe_load(f)
+        if use_disk_cache:
+            _write_cache(path, key, tasks)
+
+    template = ParserTemplate(path, tasks)
+    _TEMPLATES[path] = (key, template)
+    return template
+
+
+def parse_template(path, content, templar, variables=None):
+    """ Parses content with the compiled template found at path """
+    return CommandParser(templar).parse(load_template(path), content, variables)
+
+
+# constructs that match differently at the start of a sliced string than at
+# the same position of the whole string, the line and word boundaries only
+# do so when the string is sliced in the middle of a line
+SLICE_SENSITIVE = ('\\A', '(?<')
+LINE_SLICE_SENSITIVE = ('^', '\\b', '\\B')
+
+
+def _search_from(regex, content, pos):
+    """ Returns the span of the first match of regex in content[pos:]
+
+    The span is relative to content.  Searching from pos gives the same
+    result as searching the sliced string, without copying it, unless the
+    pattern uses anchors, word boundaries or lookbehinds that would see the
+    text before pos.  Those patterns search the sliced string like the
+    command_parser action does.
+    """
+    sliced = pos >= len(content) or any(c in regex.pattern for c in SLICE_SENSITIVE)
+    if not sliced and content[pos - 1] != '\n':
+        sliced = any(c in regex.pattern for c in LINE_SLICE_SENSITIVE)
+    if pos and sliced:
+        match = regex.search(content[pos:])
+        if match:
+            return (pos + match.start(), pos + match.end())
+        return None
+    match = regex.search(content, pos)
+    if match:
+        return match.span()
+
+
+class CommandParser(object):
+    """ Runs compiled parser templates """
+
+    def __init__(self, templar):
+        self._templar = templar
+        self.ds = {}
+
+    def parse(self, template, content, variables=None):
+        """ Parses content with template and returns the exported facts """
+        self.ds = {'content': content}
+        self.ds.update(variables or {})
+
+        facts = {}
+        for task in template.directives:
+            if task.when is not None and not self._check_conditional(task.when):
+                continue
+
+            if task.loop is not None:
+                loop = self.template(task.loop)
+                res = list()
+                if loop:
+                    if isinstance(loop, Mapping):
+                        for loop_key, loop_value in iteritems(loop):
+                            self.ds[task.loop_var] = {'key': loop_key, 'value': loop_value}
+                            res.append(self._process_directive(task))
+                    else:
+                        for loop_item in loop:
+                            self.ds[task.loop_var] = loop_item
+                            res.append(self._process_directive(task))
+
+                if task.register:
+                    self.ds[task.register] = res
+                if task.export and task.register:
+                    if task.directive != 'set_vars' and self._export_as(task) in ('dict', 'hash', 'object'):
+                        res = self._to_dict(res)
+                    facts = self._export(facts, task, {task.register: res})
+            else:
+                res = self._process_directive(task)
+                if task.directive == 'set_vars' and not task.register:
+                    self.ds.update(res)
+                    if task.export:
+                        facts = self._export(facts, task, res)
+                elif task.register:
+                    self.ds[task.register] = res
+                    if task.export:
+                        facts = self._export(facts, task, {task.register: res})
+
+        return facts
+
+    def _export_as(self, task):
+        export_as = self.template(task.export_as)
+        if export_as not in VALID_EXPORT_AS:
+            raise ParserError('invalid value for export_as, got %s' % export_as)
+        return export_as
+
+    def _export(self, facts, task, obj):
+        if task.extend is not None:
+            extend = self.template(task.extend)
+            if extend:
+                for key in reversed(extend.split('.')):
+                    obj = {key: obj}
+        return merge_facts(facts, obj)
+
+    def _to_dict(self, res):
+        obj = {}
+        for item in res:
+            if isinstance(item, Mapping):
+                obj.update(item)
+        return obj
+
+    def _process_directive(self, task):
+        if task.directive == 'pattern_group':
+            return self._process_pattern_group(task.args)
+        elif task.directive == 'pattern_match':
+            return self._process_pattern_match(task.args)
+        elif task.directive == 'json_template':
+            return self._process_json_template(task.args)
+        return self.template(task.args)
+
+    def _process_pattern_group(self, tasks):
+        results = dict()
+        for task in tasks:
+            if task.when is not None and not self._check_conditional(task.when):
+                continue
+
+            loop = self.template(task.loop) if task.loop is not None else None
+            if loop and isinstance(loop, Iterable) and not isinstance(loop, string_types):
+                res = list()
+                for loop_item in loop:
+                    self.ds[task.loop_var] = loop_item
+                    res.append(self._process_directive(task))
+            else:
+                res = self._process_directive(task)
+
+            if task.register:
+                results[task.register] = res
+
+        return results
+
+    def _process_pattern_match(self, args):
+        content = self.template(args.get('content')) if 'content' in args else None
+        content = content or self.ds['content']
+
+        regex = self._regex(args['regex'])
+        match_all = self.template(args['match_all']) if 'match_all' in args else False
+        match_greedy = self.template(args['match_greedy']) if 'match_greedy' in args else False
+        match_until = self._regex(args['match_until']) if 'match_until' in args else None
+
+        if match_greedy:
+            return self._greedy_match(content, regex, end=match_until, match_all=match_all)
+        elif match_all:
+            return self._match_all(content, regex)
+        else:
+            return self._match(content, regex)
+
+    def _regex(self, regex):
+        if isinstance(regex, Expression):
+            regex = self.template(regex)
+            if not regex:
+                return None
+            return re.compile(regex, re.M)
+        return regex
+
+    def _greedy_match(self, content, start, end=None, match_all=None):
+        """ Filter a section of the content text for matching
+        """
+        section_data = list()
+
+        if match_all:
+            pos = 0
+            while True:
+                section_range = self._get_section_range(content, pos, start, end)
+                if not section_range:
+                    break
+
+                sidx, eidx = section_range
+
+                if eidx is not None:
+                    section_data.append(content[sidx:eidx])
+                    pos = eidx
+                else:
+                    section_data.append(content[sidx:])
+                    break
+
+        else:
+            section_data.append(content)
+
+        return section_data
+
+    def _get_section_range(self, content, pos, start, end=None):
+        """ Returns the first section of content[pos:] that matches the start
+        and end markers
+        """
+        if end is not None:
+            include_end = True
+        else:
+            end = start
+            include_end = False
+
+        context_start = _search_from(start, content, pos)
+        if not context_start:
+            return
+
+        string_start = context_start[0]
+        offset = context_start[1] + 1
+
+        context_end = _search_from(end, content, offset)
+        if not context_end:
+            return (string_start, None)
+
+        if include_end:
+            string_end = context_end[1]
+        else:
+            string_end = context_end[0]
+
+        return (string_start, string_end)
+
+    def _match_all(self, content, regex):
+        """ Match all occurrences of regex in content
+        """
+        objects = list()
+        for match in regex.findall(content):
+            obj = {'matches': match}
+            if regex.groupindex:
+                for name, index in iteritems(regex.groupindex):
+                    if len(regex.groupindex) == 1:
+                        obj[name] = match
+                    else:
+                        obj[name] = match[index - 1]
+            objects.append(obj)
+        if objects:
+            return objects
+
+    def _match(self, content, regex):
+        """ Match pattern in content
+        """
+        match = regex.search(content)
+        if match:
+            items = list(match.groups())
+            obj = {}
+            if regex.groupindex:
+                for name, index in iteritems(regex.groupindex):
+                    obj[name] = items[index - 1]
+            obj['matches'] = items
+            return obj
+
+    def _process_json_template(self, template):
+        templated_items = {}
+
+        for item in template.items:
+            key = self.template(item['key'])
+
+            if item['when'] is not None and not self._check_conditional(item['when']):
+                continue
+
+            value = item['value']
+            repeat_for = item['repeat_for']
+
+            if item['type'] == 'value':
+                value = self.template(value)
+
+            elif repeat_for is not None:
+                loop = self.template(repeat_for) or []
+                results = list()
+                for loop_item in loop:
+                    self.ds[item['repeat_var']] = loop_item
+                    if isinstance(value, JsonTemplate):
+                        results.append(self._process_json_template(value))
+                    else:
+                        results.append(self.template(value))
+                value = results
+
+            elif isinstance(value, JsonTemplate):
+                value = self._process_json_template(value)
+                if item['type'] == 'elements':
+                    value = [value]
+
+            else:
+                value = self.template(value)
+
+            templated_items[key] = value
+
+        return templated_items
+
+    def _check_conditional(self, when):
+        conditional = "{%% if %s %%}True{%% else %%}False{%% endif %%}" % when
+        return self._render(conditional) in (True, 'True')
+
+    def template(self, data):
+        """ Templates the (compiled) data using the current variables
+        """
+        if isinstance(data, Expression):
+            if data.literal:
+                return data.value
+            if data.path is not None:
+                value = self._lookup(data.path)
+                if value is UNDEFINED:
+                    return None
+                if value is not FALLBACK:
+                    return value
+            return self._render(data.value)
+
+        elif isinstance(data, Mapping):
+            return dict((self.template(k), self.template(v)) for k, v in iteritems(data))
+
+        elif isinstance(data, list):
+            return [self.template(i) for i in data]
+
+        return data
+
+    def _lookup(self, path):
+        """ Resolves a simple variable path such as `item.name.matches.0`
+
+        Returns UNDEFINED when the path does not exist or FALLBACK when the
+        value could be changed by the templar and must be rendered instead.
+        """
+        name = path[0]
+        if name not in self.ds:
+            return FALLBACK
+        obj = self.ds[name]
+
+        for part in path[1:]:
+            if isinstance(part, int):
+                try:
+                    obj = obj[part]
+                except (TypeError, LookupError):
+                    return UNDEFINED
+            elif hasattr(obj, part):
+                return FALLBACK
+            else:
+                try:
+                    obj = obj[part]
+                except (TypeError, LookupError):
+                    return UNDEFINED
+
+        # values other than plain strings are converted by the templar so
+        # hand those back to it to get the same result
+        if not isinstance(obj, string_types) or is_template(obj):
+            return FALLBACK
+        if obj.startswith(('[', '{')) or obj in ('True', 'False'):
+            return FALLBACK
+        return obj
+
+    def _render(self, data):
+        templar = self._templar
+        saved = templar._available_variables
+        _set_available_variables(templar, self.ds)
+        try:
+            return templar.template(data)
+        except AnsibleUndefinedVariable:
+            return None
+        finally:
+            _set_available_variables(templar, saved)
+
+
+def _set_available_variables(templar, variables):
+    if isinstance(getattr(type(templar), 'available_variables', None), property):
+        templar.available_variables = variables
+    else:
+        templar.set_available_variables(variables)
@@ -0,0 +1,410 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Hierarchical IOS configuration trees
+
+The configuration text is parsed into a tree of sections based on the line
+indentation.  Each section has a hash computed from its line and the hashes
+of its children, so two trees can be compared by only descending into the
+sections whose hashes differ; unchanged sections are skipped with a single
+comparison no matter how large they are.
+"""
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import hashlib
+
+from collections import OrderedDict
+
+from ansible.module_utils._text import to_bytes
+
+
+DIFF_HEADER = '!Contextual Config Diffs:'
+NO_CHANGES = '!No changes were found'
+
+# lines that are not part of the configuration or that change on their own
+IGNORE_PREFIXES = ('!', 'Building configuration', 'Current configuration', 'ntp clock-period')
+
+# show running-config displays the delimiter of a banner as ^C
+CTRL_C_DELIMITER = '^C'
+
+# separates a repeated child line from its occurrence in the children keys
+DUPLICATE_SEPARATOR = '\x00'
+
+# commands that can only be configured once in a section, configuring one of
+# these replaces the existing value
+SINGLE_VALUE_COMMANDS = (
+    'hostname', 'description', 'ip address', 'ipv6 address', 'ip domain name',
+    'ip domain-name', 'mtu', 'ip mtu', 'bandwidth', 'speed', 'duplex',
+    'encapsulation', 'switchport mode', 'switchport access vlan',
+    'enable secret', 'clock timezone', 'router-id', 'bgp router-id',
+)
+
+# commands that are not configured by default and are always displayed by
+# show running-config once configured, a `no` command for one of these that
+# is not in the running-config does not change anything.  Commands enabled
+# by default, such as `cdp run` or `ip proxy-arp`, are not displayed and
+# must never be listed here.
+NON_DEFAULT_COMMANDS = (
+    'access-list', 'ip access-list', 'ipv6 access-list', 'ip prefix-list',
+    'ipv6 prefix-list', 'route-map', 'username', 'ip route', 'ipv6 route',
+    'ip name-server', 'ntp server', 'ntp peer', 'logging host',
+    'snmp-server community', 'snmp-server host', 'snmp-server location',
+    'snmp-server contact', 'tacacs-server host', 'radius-server host',
+    'ip helper-address', 'description', 'interface Loopback',
+    'interface Tunnel', 'interface Port-channel', 'interface Vlan',
+    'router bgp', 'router ospf', 'router eigrp', 'vrf definition',
+    'ip vrf', 'class-map', 'policy-map', 'crypto map', 'banner',
+)
+
+
+class ConfigNode(object):
+    """ A single configuration line and its children
+
+    The children of a section are parsed from its lines the first time they
+    are accessed, so sections that are never looked at are never parsed.
+    """
+
+    __slots__ = ('line', '_children', '_block', '_hash')
+
+    def __init__(self, line=None):
+        self.line = line
+        self._children = OrderedDict()
+        self._block = None
+        self._hash = None
+
+    @property
+    def children(self):
+        if self._block is not None:
+            block, self._block = self._block, None
+            _build(self, block)
+        return self._children
+
+    @children.setter
+    def children(self, value):
+        self._children = value
+        self._block = None
+
+    @property
+    def hash(self):
+        """ Returns the hash of the line and all of its children
+
+        The hash is computed once and cached, so the tree must not be
+        modified after the hash has been read.
+        """
+        if self._hash is None:
+            sha1 = hashlib.sha1(to_bytes(self.line or '', errors='surrogate_or_strict'))
+            for child in self.children.values():
+                sha1.update(b'\n')
+                sha1.update(child.hash)
+            self._hash = sha1.digest()
+        return self._hash
+
+    def add(self, line):
+        """ Returns the child for line, adding it if it does not exist """
+        children = self.children
+        node = children.get(line)
+        if node is None:
+            node = children[line] = ConfigNode(line)
+            self._hash = None
+        return node
+
+    def append(self, line):
+        """ Adds a child for line after the existing children
+
+        Child lines of a section can be repeated, such as the remarks of an
+        access-list, each occurrence after the first is keyed by the line
+        and its occurrence so the order of the lines is kept.
+        """
+        children = self.children
+        key = line
+        count = 1
+        while key in children:
+            count += 1
+            key = '%s%s%d' % (line, DUPLICATE_SEPARATOR, count)
+        node = children[key] = ConfigNode(line)
+        self._hash = None
+        return node
+
+    def copy(self):
+        """ Returns a shallow copy, the children are shared """
+        node = ConfigNode(self.line)
+        node.children = OrderedDict(self.children)
+        return node
+
+    def lines(self, depth=0):
+        """ Yields (depth, line) for all of the children """
+        for child in self.children.values():
+            yield depth, child.line
+            for item in child.lines(depth + 1):
+                yield item
+
+    def to_text(self):
+        return '\n'.join('%s%s' % (' ' * depth, line) for depth, line in self.lines())
+
+
+def banner_delimiter(text):
+    """ Returns the delimiter, the opening delimiters and the rest of text
+
+    text is what follows `banner <type>` on the banner line.  The delimiter
+    is `^C` or the first character, the text of the banner starts after
+    any repetition of it, for instance after `@@@` or on the banner line
+    itself with `#Welcome`.  An empty delimiter is returned for empty text.
+    """
+    text = text.strip()
+    delimiter = CTRL_C_DELIMITER if text.startswith(CTRL_C_DELIMITER) else text[:1]
+    start = 0
+    while delimiter and text.startswith(delimiter, start):
+        start += len(delimiter)
+    return delimiter, text[:start], text[start:]
+
+
+def banner_end(line, delimiter):
+    """ Returns where the closing delimiters of a banner start in line
+
+    A banner ends on the line that ends with its delimiter, -1 is returned
+    when line does not end the banner.
+    """
+    line = line.rstrip()
+    end = len(line)
+    while line.endswith(delimiter, 0, end):
+        end -= len(delimiter)
+    return end if end != len(line) else -1
+
+
+def _build(parent, block):
+    """ Adds the indented lines of a section to parent """
+    stack = [(-1, parent)]
+    for line in block:
+        indent = len(line) - len(line.lstrip(' '))
+        while stack[-1][0] >= indent:
+            stack.pop()
+        node = stack[-1][1].append(line.strip())
+        stack.append((indent, node))
+
+
+def _hash_section(section, header, block):
+    if section is not None and section._hash is None:
+        sha1 = hashlib.sha1(to_bytes(header, errors='surrogate_or_strict'))
+        for line in block:
+            sha1.update(b'\n')
+            sha1.update(to_bytes(line, errors='surrogate_or_strict'))
+        section._hash = sha1.digest()
+
+
+def parse(text):
+    """ Parses configuration text into a tree of ConfigNode objects
+
+    Comments, blank lines and the show running-config header are ignored.
+    Multi-line banners are stored as a single node and repeated lines in a
+    section, such as access-list remarks, are kept in order.
+
+    Only the top level lines are parsed up front, each of them indexes the
+    lines of its section which are parsed when the section is accessed.  A
+    section that appears only once is hashed from its text, sections that
+    are equal in both trees are then compared without ever parsing them.
+    """
+    root = ConfigNode()
+    children = root._children
+    banner = None
+    section = header = None
+    block = list()
+    repeated = set()
+
+    for line in text.splitlines():
+        if banner is not None:
+            banner[1].append(line)
+            if banner_end(line, banner[0]) != -1:
+                root.add('\n'.join(banner[1]))
+                banner = None
+            continue
+
+        stripped = line.strip()
+        if not stripped or stripped.startswith(IGNORE_PREFIXES) or line == 'end':
+            continue
+
+        if line[0] == ' ':
+            if section is None:
+                # indented line without a section, keep it at the top level
+                root.add(stripped)
+            else:
+                block.append(line.rstrip())
+            continue
+
+        _hash_section(section, header, block)
+        section = None
+
+        if stripped.startswith('banner '):
+            parts = stripped.split(None, 2)
+            delimiter, _, body = banner_delimiter(parts[2]) if len(parts) == 3 else ('', '', '')
+            if delimiter and banner_end(body, delimiter) == -1:
+                banner = (delimiter, [line])
+                continue
+
+        section = children.get(stripped)
+        if section is None:
+            section = children[stripped] = ConfigNode(stripped)
+            section._block = block = list()
+        else:
+            # the section is repeated, hash it from its nodes instead
+            repeated.add(stripped)
+            block = section._block
+            if block is None:
+                block = section._block = list()
+        header = line.rstrip()
+
+    _hash_section(section, header, block)
+
+    for line in repeated:
+        children[line]._hash = None
+
+    if banner is not None:
+        # unterminated banner, keep it as is
+        root.add('\n'.join(banner[1]))
+
+    return root
+
+
+def _format(depth, sign, line):
+    indent = ' ' * depth
+    return '\n'.join('%s%s%s' % (indent, sign, item) for item in line.split('\n'))
+
+
+def _section_lines(node, depth, sign):
+    yield _format(depth, sign, node.line)
+    for child in node.children.values():
+        for line in _section_lines(child, depth + 1, sign):
+            yield line
+
+
+def _diff(before, after, depth):
+    for key, node in after.children.items():
+        other = before.children.get(key)
+        if other is None:
+            for item in _section_lines(node, depth, '+'):
+                yield item
+        elif other.hash != node.hash:
+            changes = list(_diff(other, node, depth + 1))
+            if changes:
+                yield _format(depth, '', node.line)
+                for item in changes:
+                    yield item
+
+    for key, node in before.children.items():
+        if key not in after.children:
+            for item in _section_lines(node, depth, '-'):
+                yield item
+
+
+def diff(before, after):
+    """ Returns the contextual diff between two trees as a list of lines
+
+    Added lines are prefixed with `+`, removed lines with `-` and the
+    parents of changed lines are included without a prefix, similar to the
+    output of show archive config differences.  An empty list is returned
+    when the trees are the same.
+    """
+    if before.hash == after.hash:
+        return []
+    return list(_diff(before, after, 0))
+
+
+def format_diff(lines):
+    """ Returns the diff lines as text in the show archive format """
+    if not lines:
+        return NO_CHANGES
+    return '\n'.join([DIFF_HEADER] + lines)
+
+
+def _never_configured(node, line):
+    """ Returns True when the `no` command line provably does nothing
+
+    This is only the case when the negated command is one of the
+    NON_DEFAULT_COMMANDS and it is not configured under node.
+    """
+    target = line[3:].strip()
+    if not any(target == command or target.startswith(command + ' ') for command in NON_DEFAULT_COMMANDS):
+        return False
+    return not _negated(node, line)
+
+
+def _negated(node, line):
+    """ Returns the children of node removed by the `no` command line """
+    target = line[3:].strip()
+    return [key for key, child in node.children.items()
+            if child.line == target or child.line.startswith(target + ' ')]
+
+
+def _replaced(node, line):
+    """ Returns the children of node replaced by configuring line """
+    for command in SINGLE_VALUE_COMMANDS:
+        if line.startswith(command + ' ') and not line.endswith(' secondary'):
+            return [key for key, child in node.children.items()
+                    if child.line != line and child.line.startswith(command + ' ') and not child.line.endswith(' secondary')]
+    return []
+
+
+def merge(base, candidate):
+    """ Returns the tree that results from merging candidate into base
+
+    This approximates how the device applies candidate in configuration
+    mode: new lines are added to their sections, `no` commands remove the
+    lines they negate and commands that can only be configured once
+    replace the existing value.  base is not modified.
+    """
+    merged = base.copy()
+    for key, node in candidate.children.items():
+        if node.line.startswith('no '):
+            for negated in _negated(merged, node.line):
+                del merged.children[negated]
+            continue
+
+        for replaced in _replaced(merged, node.line):
+            del merged.children[replaced]
+
+        existing = merged.children.get(key)
+        if existing is None:
+            merged.children[key] = merge(ConfigNode(node.line), node) if node.children else node
+        elif node.children:
+            merged.children[key] = merge(existing, node)
+
+    return merged
+
+
+def _delta(base, candidate, depth):
+    for key, node in candidate.children.items():
+        if node.line.startswith('no '):
+            # the running-config does not display commands that are enabled
+            # by default, so a `no` command is only dropped when it is
+            # already displayed or provably negates nothing
+            if key not in base.children and not _never_configured(base, node.line):
+                yield _format(depth, '', node.line)
+            continue
+
+        existing = base.children.get(key)
+        if existing is None:
+            for item in _section_lines(node, depth, ''):
+                yield item
+        elif node.children and existing.hash != node.hash:
+            changes = list(_delta(existing, node, depth + 1))
+            if changes:
+                yield _format(depth, '', node.line)
+                for item in changes:
+                    yield item
+
+
+def delta(base, candidate):
+    """ Returns the lines of candidate that would change base
+
+    Lines that are already configured are dropped, sections are only
+    included when some of their lines change.  `no` commands are always
+    included unless the running-config already displays them or they
+    negate one of the NON_DEFAULT_COMMANDS that is not configured.  Merging the returned lines
+    has the same effect as merging all of candidate, an empty list means
+    merging candidate would not change the configuration.
+    """
+    return list(_delta(base, candidate, 0))
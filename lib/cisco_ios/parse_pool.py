@@ -0,0 +1,274 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Shared pool of parser processes on the controller
+
+Every fork parses the output of its own host, so with a large number of
+forks the parsers of all forks compete for the CPUs with the persistent
+connections that are talking to the devices.  The parse pool is a single
+server process per controller user, started by the first fork that needs
+it, that parses command output with a fixed number of worker processes.
+Forks send the output over a unix socket and wait for the facts, so at most
+the configured number of CPUs are spent parsing no matter how many forks
+are running.  The server exits once it has been idle for a while.
+
+Only the variables referenced by the parser template are sent with the
+output, so the facts returned to a fork only ever depend on its own host.
+TextFSM templates are parsed by the workers as well, the compiled
+templates are kept by the workers for as long as the pool runs.
+A fork that gets no answer within PARSE_TIMEOUT seconds parses the output
+itself.
+"""
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import errno
+import fcntl
+import os
+import re
+import socket
+import struct
+import subprocess
+import sys
+import threading
+import time
+
+from ansible.module_utils.six.moves import cPickle as pickle
+
+from cisco_ios.utils import cpu_time, get_cache_dir
+
+
+# the server exits after this many seconds without a request
+IDLE_TIMEOUT = 60
+
+# how long a fork waits for a server it started to accept connections
+START_TIMEOUT = 10
+
+# how long a fork waits for the facts and a worker may take to parse
+PARSE_TIMEOUT = 300
+
+HEADER = struct.Struct('!I')
+IDENTIFIER_RE = re.compile(r'[A-Za-z_]\w*')
+
+LIB_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ROLE_DIR = os.path.dirname(LIB_DIR)
+
+# runs the server in a new interpreter with the role's lib on the path
+SERVER_COMMAND = 'import sys; sys.path.insert(0, sys.argv[1]); from cisco_ios.parse_pool import Server; Server(sys.argv[2], int(sys.argv[3])).serve()'
+
+_NAMES = {}
+
+
+class ParsePoolError(Exception):
+    pass
+
+
+def socket_path(workers):
+    """ Returns the path of the socket of the pool with workers processes """
+    directory = get_cache_dir('parse_pool')
+    os.chmod(directory, 0o700)
+    return os.path.join(directory, '%d.sock' % workers)
+
+
+def referenced_names(path):
+    """ Returns the identifiers used in the template at path
+
+    This is a superset of the variables the template can reference, it also
+    includes filter names, registered names and so on, which is fine since
+    it is only used to select variables to send to the pool.
+    """
+    stat = os.stat(path)
+    key = (path, stat.st_mtime, stat.st_size)
+    names = _NAMES.get(key)
+    if names is None:
+        with open(path) as f:
+            names = _NAMES[key] = frozenset(IDENTIFIER_RE.findall(f.read()))
+    return names
+
+
+def _send(sock, obj):
+    data = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+    sock.sendall(HEADER.pack(len(data)) + data)
+
+
+def _recv(sock):
+    def read(size):
+        chunks = list()
+        while size:
+            chunk = sock.recv(min(size, 1048576))
+            if not chunk:
+                raise EOFError('connection closed')
+            chunks.append(chunk)
+            size -= len(chunk)
+        return b''.join(chunks)
+    return pickle.loads(read(HEADER.unpack(read(HEADER.size))[0]))
+
+
+def _connect(path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except socket.error:
+        sock.close()
+        raise
+    return sock
+
+
+def _start(path, workers):
+    """ Starts the server in the background and waits for it to listen """
+    with open(os.devnull, 'r+') as devnull:
+        subprocess.Popen([sys.executable, '-c', SERVER_COMMAND, LIB_DIR, path, str(workers)],
+                         stdin=devnull, stdout=devnull, stderr=devnull, close_fds=True,
+                         preexec_fn=os.setsid)
+
+    deadline = time.time() + START_TIMEOUT
+    while time.time() < deadline:
+        try:
+            return _connect(path)
+        except socket.error:
+            time.sleep(0.05)
+    raise ParsePoolError('timed out waiting for the parse pool to start')
+
+
+def parse(path, content, variables, workers, timeout=PARSE_TIMEOUT, engine='command_parser', name=None):
+    """ Parses content with the template at path in the pool
+
+    Returns the facts and the CPU time in seconds the worker spent parsing.
+    Only the variables referenced by the template are sent to the pool.
+    With the textfsm_parser engine the rows are returned as the name fact,
+    no variables are sent.
+    Raises ParsePoolError when the pool is not available, does not answer
+    within timeout seconds or the template could not be parsed by the pool.
+    """
+    if engine == 'textfsm_parser':
+        variables = {}
+    else:
+        names = referenced_names(path)
+        variables = dict((k, v) for k, v in variables.items() if k in names)
+
+    sock_path = socket_path(workers)
+    try:
+        try:
+            sock = _connect(sock_path)
+        except socket.error:
+            sock = _start(sock_path, workers)
+        try:
+            sock.settimeout(timeout)
+            _send(sock, (engine, path, content, variables, name))
+            status, value, parse_cpu_time = _recv(sock)
+        finally:
+            sock.close()
+    except (socket.error, EOFError, pickle.PicklingError, AttributeError, TypeError) as exc:
+        raise ParsePoolError('parse pool error: %s' % exc)
+
+    if status != 'ok':
+        raise ParsePoolError(value)
+    return value, parse_cpu_time
+
+
+_TEMPLAR = None
+
+
+def _parse(engine, path, content, variables, name):
+    """ Runs in the worker processes """
+    start = cpu_time()
+    try:
+        if engine == 'textfsm_parser':
+            from cisco_ios.textfsm_templates import parse_facts
+            return 'ok', parse_facts(path, content, name), cpu_time() - start
+        return 'ok', _parse_template(path, content, variables), cpu_time() - start
+    except Exception as exc:
+        return 'error', '%s: %s' % (type(exc).__name__, exc), cpu_time() - start
+
+
+def _parse_template(path, content, variables):
+    global _TEMPLAR
+    from cisco_ios.command_parser import parse_template
+    from cisco_ios.parsers import get_native_parser
+
+    native = get_native_parser(path)
+    if native is not None:
+        return native(content)
+
+    if _TEMPLAR is None:
+        from ansible.parsing.dataloader import DataLoader
+        from ansible.plugins.loader import filter_loader
+        from ansible.template import Templar
+        filter_loader.add_directory(os.path.join(ROLE_DIR, 'filter_plugins'))
+        _TEMPLAR = Templar(loader=DataLoader())
+    return parse_template(path, content, _TEMPLAR, variables)
+
+
+class Server(object):
+
+    def __init__(self, path, workers):
+        self.path = path
+        self.workers = workers
+        self.active = 0
+        self.last_request = time.time()
+        self.lock = threading.Lock()
+
+    def serve(self):
+        import multiprocessing
+
+        with open(self.path + '.lock', 'w') as lock:
+            # only one server may bind the socket, a fork that finds the
+            # socket in use simply connects to the running server
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                _connect(self.path).close()
+                return
+            except socket.error:
+                pass
+            try:
+                os.unlink(self.path)
+            except OSError as exc:
+                if exc.errno != errno.ENOENT:
+                    raise
+            listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            listener.bind(self.path)
+            listener.listen(128)
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+        pool = multiprocessing.Pool(self.workers)
+        listener.settimeout(1)
+        try:
+            while True:
+                try:
+                    conn, _ = listener.accept()
+                except socket.timeout:
+                    with self.lock:
+                        if not self.active and time.time() - self.last_request > IDLE_TIMEOUT:
+                            break
+                    continue
+                with self.lock:
+                    self.active += 1
+                    self.last_request = time.time()
+                thread = threading.Thread(target=self.handle, args=(conn, pool))
+                thread.daemon = True
+                thread.start()
+        finally:
+            listener.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+            pool.terminate()
+
+    def handle(self, conn, pool):
+        try:
+            conn.settimeout(PARSE_TIMEOUT)
+            _send(conn, pool.apply_async(_parse, _recv(conn)).get(PARSE_TIMEOUT))
+        except Exception:
+            # the fork parses the output itself when the pool fails or the
+            # worker takes too long
+            pass
+        finally:
+            conn.close()
+            with self.lock:
+                self.active -= 1
+                self.last_request = time.time()
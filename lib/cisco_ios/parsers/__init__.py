@@ -0,0 +1,39 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Native parsers for the parser templates shipped with the role
+
+Some of the role's command_parser templates are run against very large
+outputs.  For those templates a native parser that produces exactly the
+same facts is provided and used in place of the template.  Native parsers
+are only ever used for the template files shipped with the role so
+templates overridden in the parser search path are always honoured.
+"""
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import os
+
+from cisco_ios.parsers import show_interfaces
+
+
+PARSER_TEMPLATES_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))),
+    'parser_templates'
+)
+
+NATIVE_PARSERS = {
+    os.path.join('cli', 'show_interfaces.yaml'): show_interfaces.parse,
+}
+
+_REGISTRY = dict((os.path.realpath(os.path.join(PARSER_TEMPLATES_DIR, path)), parser)
+                 for path, parser in NATIVE_PARSERS.items())
+
+
+def get_native_parser(path):
+    """ Returns the native parser for the template at path or None """
+    return _REGISTRY.get(os.path.realpath(path))
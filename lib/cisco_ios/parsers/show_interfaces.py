@@ -0,0 +1,145 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Native parser for the output of `show interfaces`
+
+Returns the same facts as parser_templates/cli/show_interfaces.yaml but
+walks the output a single time, dispatching each line on its prefix,
+instead of splitting the output into sections and running every pattern
+of the template over each section.
+"""
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import re
+
+
+SECTION_RE = re.compile(r'^\S+ is (up|down|administratively down),')
+HARDWARE_RE = re.compile(r'Hardware is (.*(?=,)|.*)')
+MTU_RE = re.compile(r'MTU (\d+)')
+DESCRIPTION_RE = re.compile(r'Description: (.+)')
+LINE_PROTOCOL_RE = re.compile(r'line protocol is (\S+)')
+PACKETS_INPUT_RE = re.compile(r'(\d+) packets input, (\d+)')
+BROADCASTS_RE = re.compile(r'Received (\d+) broadcasts \(\d+')
+PACKETS_OUTPUT_RE = re.compile(r'(\d+) packets output, (\d+) bytes')
+OUTPUT_ERRORS_RE = re.compile(r'(\d+) output errors')
+
+DIGITS = frozenset('0123456789')
+
+
+class _Interface(object):
+
+    __slots__ = ('name', 'type', 'mtu', 'description', 'disabled', 'operstatus',
+                 'in_pkts', 'in_octets', 'in_bcast', 'out_pkts', 'out_octets', 'out_errors')
+
+    def __init__(self, name):
+        self.name = name
+        self.type = self.mtu = self.description = self.operstatus = None
+        self.in_pkts = self.in_octets = self.in_bcast = None
+        self.out_pkts = self.out_octets = self.out_errors = None
+        self.disabled = False
+
+    def to_dict(self):
+        enabled = not self.disabled
+        return {
+            'name': self.name,
+            'type': self.type,
+            'mtu': self.mtu,
+            'description': self.description,
+            'enabled': enabled,
+            'admin-status': 'enabled' if enabled else 'disabled',
+            'oper-status': self.operstatus,
+            'counters': {
+                # the key names follow the template, which stores the
+                # packet count as in-octets and the byte count as
+                # in-unicast-pkts
+                'in-octets': self.in_pkts,
+                'in-unicast-pkts': self.in_octets,
+                'in-broadcast-pkts': self.in_bcast,
+                'in-multicast-pkts': None,
+                'out-octets': self.out_pkts,
+                'out-unicast-pkts': self.out_octets,
+                'out-errors': self.out_errors
+            }
+        }
+
+
+def _parse_line(intf, line):
+    """ Updates intf with the values found in a single line of output
+
+    Only values that have not been found yet are updated so the first
+    match in the section wins, as it does for the template.
+    """
+    text = line.lstrip()
+    if not text:
+        return
+
+    first = text[0]
+    if first in DIGITS:
+        if intf.in_pkts is None and ' packets input, ' in text:
+            match = PACKETS_INPUT_RE.search(text)
+            if match:
+                intf.in_pkts, intf.in_octets = match.groups()
+        elif intf.out_pkts is None and ' packets output, ' in text:
+            match = PACKETS_OUTPUT_RE.search(text)
+            if match:
+                intf.out_pkts, intf.out_octets = match.groups()
+        elif intf.out_errors is None and ' output errors' in text:
+            match = OUTPUT_ERRORS_RE.search(text)
+            if match:
+                intf.out_errors = match.group(1)
+    elif first == 'H':
+        if intf.type is None and text.startswith('Hardware is '):
+            intf.type = HARDWARE_RE.search(text).group(1)
+    elif first == 'D':
+        if intf.description is None and text.startswith('Description: '):
+            match = DESCRIPTION_RE.search(text)
+            if match:
+                intf.description = match.group(1)
+    elif first == 'M':
+        if intf.mtu is None and text.startswith('MTU '):
+            match = MTU_RE.match(text)
+            if match:
+                intf.mtu = match.group(1)
+    elif first == 'R':
+        if intf.in_bcast is None and text.startswith('Received '):
+            match = BROADCASTS_RE.match(text)
+            if match:
+                intf.in_bcast = match.group(1)
+
+
+def _parse_header(intf, line):
+    if 'administratively down' in line:
+        intf.disabled = True
+    match = LINE_PROTOCOL_RE.search(line)
+    if match:
+        intf.operstatus = match.group(1)
+
+
+def parse_interfaces(content):
+    """ Returns a dict of interface name to interface facts """
+    interfaces = {}
+    intf = None
+
+    for line in content.splitlines():
+        if line and not line[0].isspace() and SECTION_RE.match(line):
+            if intf is not None:
+                interfaces[intf.name] = intf.to_dict()
+            intf = _Interface(line.split(None, 1)[0])
+            _parse_header(intf, line)
+        elif intf is not None:
+            _parse_line(intf, line)
+
+    if intf is not None:
+        interfaces[intf.name] = intf.to_dict()
+
+    return interfaces
+
+
+def parse(content):
+    """ Parses the output of `show interfaces` into the role facts """
+    return {'cisco_ios': {'interfaces': parse_interfaces(content)}}
@@ -0,0 +1,139 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Native parser for the output of `show ip access-lists`
+
+Returns the same header and rows as the textfsm template
+parser_templates/net_operations/show_ip_access_list.yaml in a single pass
+over the output.  The line expressions are built from the same value
+definitions as the template.  Parsed rows are cached on disk by the hash
+of the output so unchanged access-lists are not parsed again, only the
+most recent outputs are kept.
+"""
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import hashlib
+import re
+
+from ansible.module_utils._text import to_bytes
+
+from cisco_ios.utils import read_cache, write_cache
+
+
+CACHE_VERSION = 2
+# outputs of large access-lists take megabytes, keep only a few of them
+CACHE_MAX_ENTRIES = 16
+
+VALUES = (
+    ('ACL_TYPE', r'(Standard|Extended)'),
+    ('ACL_NAME', r'(\S+)'),
+    ('LINE_NUM', r'(\d+)'),
+    ('ACTION', r'(permit|deny)'),
+    ('PROTOCOL', r'([a-z]+)'),
+    ('SRC_HOST', r'(\d+\.\d+\.\d+\.\d+)'),
+    ('SRC_ANY', r'(any)'),
+    ('SRC_NETWORK', r'(\d+\.\d+\.\d+\.\d+)'),
+    ('SRC_WILDCARD', r'(\d+\.\d+\.\d+\.\d+)'),
+    ('SRC_PORT_MATCH', r'(eq|neq|range|lt|gt)'),
+    ('SRC_PORT', r'((?<!range\s).+?)'),
+    ('SRC_PORT_RANGE_START', r'((?<=range\s)\S+)'),
+    ('SRC_PORT_RANGE_END', r'(\S+)'),
+    ('DST_HOST', r'(\d+\.\d+\.\d+\.\d+)'),
+    ('DST_ANY', r'(any)'),
+    ('DST_NETWORK', r'(\d+\.\d+\.\d+\.\d+)'),
+    ('DST_WILDCARD', r'(\d+\.\d+\.\d+\.\d+)'),
+    ('DST_PORT_MATCH', r'(eq|neq|range|lt|gt)'),
+    ('DST_PORT', r'((?<!range\s).+?)'),
+    ('DST_PORT_RANGE_START', r'((?<=range\s)\S+)'),
+    ('DST_PORT_RANGE_END', r'(\S+)'),
+    ('FLAGS_MATCH', r'(match-all|match-any)'),
+    ('TCP_FLAG', r'(((\+|-|)ack(\s*?)|(\+|-|)established(\s*?)|(\+|-|)fin(\s*?)|(\+|-|)fragments(\s*?)|'
+                 r'(\+|-|)psh(\s*?)|(\+|-|)rst(\s*?)|(\+|-|)syn(\s*?)|urg(\s*?))+)'),
+    ('LOG', r'(log-input|log)'),
+    ('TIME', r'(\S+)'),
+    ('STATE', r'(inactive|active)'),
+    ('MATCHES', r'(\d+)'),
+    ('MATCH', r'(\d+)'),
+)
+
+HEADER = [name for name, _ in VALUES]
+FILLDOWN = ('ACL_TYPE', 'ACL_NAME')
+
+_VALUE_RE = dict(VALUES)
+
+
+def _expand(rule):
+    """ Replaces ${NAME} with a named group for the value, as textfsm does """
+    return re.compile(re.sub(r'\$\{(\w+)\}', lambda m: '(?P<%s>%s' % (m.group(1), _VALUE_RE[m.group(1)][1:]), rule))
+
+
+ACL_RE = _expand(r'^${ACL_TYPE}\s+IP\s+access\s+list\s+${ACL_NAME}\s*')
+
+EXTENDED_ACE_RE = _expand(
+    r'^\s+${LINE_NUM}\s+${ACTION}\s+${PROTOCOL}\s+(host\s+${SRC_HOST}|${SRC_ANY}|${SRC_NETWORK}\s+${SRC_WILDCARD})'
+    r'(\s+${SRC_PORT_MATCH}\s+|)(${SRC_PORT_RANGE_START}\s+${SRC_PORT_RANGE_END}|${SRC_PORT}|)'
+    r'\s+(host\s+${DST_HOST}|${DST_ANY}|${DST_NETWORK}\s+${DST_WILDCARD})'
+    r'(\s+${DST_PORT_MATCH}\s+(${DST_PORT_RANGE_START}\s+${DST_PORT_RANGE_END}|${DST_PORT}|)|\s+(${FLAGS_MATCH}\s+|)${TCP_FLAG}|)'
+    r'(\s+${LOG}|)(\s+time-range\s+${TIME}\s+\(${STATE}\)|)(?:\s+\(${MATCHES}\s+matches\)|)(?:\s+\(${MATCH}\s+match\)|)\s*$'
+)
+
+STANDARD_ACE_RE = _expand(
+    r'^\s+${LINE_NUM}\s+${ACTION}\s+(${SRC_NETWORK},\s+wildcard\s+bits\s+${SRC_WILDCARD}|${SRC_HOST}|${SRC_ANY})'
+    r'(\s+${LOG}|)(\s+time-range\s+${TIME}\s+\(${STATE}\)|)(?:\s+\(${MATCHES}\s+matches\)|)\s*$'
+)
+
+
+def _row(match, acl_type, acl_name):
+    values = match.groupdict()
+    values['ACL_TYPE'] = acl_type
+    values['ACL_NAME'] = acl_name
+    return [values.get(name) or '' for name in HEADER]
+
+
+def parse_access_lists(content):
+    """ Parses the output of `show ip access-lists`
+
+    Returns the textfsm header, the list of rows (one for each access-list
+    and one for each entry) and the list of lines that could not be parsed.
+    """
+    rows = list()
+    unparsed = list()
+    acl_type = acl_name = None
+
+    for line in content.splitlines():
+        if not line.strip():
+            continue
+
+        if line.startswith(('Standard', 'Extended')):
+            match = ACL_RE.match(line)
+            if match:
+                acl_type, acl_name = match.group('ACL_TYPE', 'ACL_NAME')
+                rows.append(_row(match, acl_type, acl_name))
+                continue
+            acl_type = acl_name = None
+        elif line[0].isspace() and acl_type:
+            match = EXTENDED_ACE_RE.match(line) or STANDARD_ACE_RE.match(line)
+            if match:
+                rows.append(_row(match, acl_type, acl_name))
+                continue
+
+        unparsed.append(line)
+
+    return HEADER, rows, unparsed
+
+
+def parse(content):
+    """ Returns parse_access_lists(content), cached by the content hash """
+    key = hashlib.sha1(to_bytes(content, errors='surrogate_or_strict')).hexdigest()
+    cached = read_cache('show_ip_access_lists', key, CACHE_VERSION)
+    if cached is not None:
+        return tuple(cached)
+
+    parsed = parse_access_lists(content)
+    write_cache('show_ip_access_lists', key, CACHE_VERSION, parsed, max_entries=CACHE_MAX_ENTRIES)
+    return parsed
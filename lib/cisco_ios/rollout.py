@@ -0,0 +1,82 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Rollout planning
+
+Splits a set of hosts into the waves a change is rolled out in.  The first
+wave is a small canary wave spread over as many sites as possible, the
+remaining hosts are distributed over waves of a fixed size with at most a
+given number of hosts of the same site in any wave.
+"""
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from collections import deque, OrderedDict
+
+
+def _next_wave(queues, size, site_limit):
+    """ Takes the hosts of the next wave from the site queues
+
+    Hosts are taken from the sites in turn so the wave is spread over as
+    many sites as possible.  The sites the wave was filled from are moved to
+    the end so the next wave starts with the sites that were left out.
+    """
+    wave = list()
+    counts = dict()
+    progress = True
+
+    while progress and len(wave) < size:
+        progress = False
+        for site in list(queues):
+            if len(wave) >= size:
+                break
+            if site_limit and counts.get(site, 0) >= site_limit:
+                continue
+            wave.append(queues[site].popleft())
+            counts[site] = counts.get(site, 0) + 1
+            progress = True
+            if not queues[site]:
+                del queues[site]
+
+    for site in counts:
+        if site in queues:
+            queues[site] = queues.pop(site)
+
+    return wave
+
+
+def plan(hosts, sites=None, canary=1, wave_size=50, site_limit=None):
+    """ Returns the list of waves to roll out to hosts in
+
+    :param hosts: the hosts in the order they should be rolled out to
+    :param sites: a dict of host to the site the host is in, hosts that are
+        not in the dict are all considered to be in the same site
+    :param canary: the number of hosts in the canary wave, the canary wave
+        has at most one host per site when there are enough sites
+    :param wave_size: the maximum number of hosts in any other wave
+    :param site_limit: the maximum number of hosts of the same site in a
+        wave, None for no limit
+    """
+    if wave_size < 1:
+        raise ValueError('wave_size must be at least 1, got %s' % wave_size)
+    if site_limit is not None and site_limit < 1:
+        raise ValueError('site_limit must be at least 1, got %s' % site_limit)
+
+    sites = sites or {}
+    queues = OrderedDict()
+    for host in hosts:
+        queues.setdefault(sites.get(host), deque()).append(host)
+
+    waves = list()
+    if canary and queues:
+        limit = 1 if len(queues) >= canary else site_limit
+        waves.append(_next_wave(queues, canary, limit))
+
+    while queues:
+        waves.append(_next_wave(queues, wave_size, site_limit))
+
+    return waves
@@ -0,0 +1,157 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Process wide cache of compiled TextFSM templates
+
+Building a TextFSM object parses the template and compiles the regular
+expression of every rule.  Templates are compiled once per process and
+kept keyed by the SHA-1 of their content.  Each parse gets a shallow copy
+of the compiled template that shares the states and rules, which are never
+modified while parsing, and only copies the values and options that hold
+the record being parsed.
+
+Rows can also be streamed with iter_rows so the whole table never has to
+be held in memory at once.
+
+A process only benefits from the cache when it parses more than once, such
+as the workers of the parse pool which run for as long as the pool does.
+"""
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import hashlib
+import io
+import os
+
+from ansible.module_utils._text import to_text
+
+try:
+    import textfsm
+except ImportError:
+    textfsm = None
+
+
+# the number of lines fed to the state machine between yielding rows
+STREAM_LINES = 1000
+
+_TEMPLATES = {}
+_PATHS = {}
+
+
+class TemplateError(Exception):
+    pass
+
+
+def _compile(path):
+    """ Returns the compiled template at path, cached by its content """
+    path = os.path.realpath(path)
+    stat = os.stat(path)
+    key = (stat.st_mtime, stat.st_size)
+
+    cached = _PATHS.get(path)
+    if cached and cached[0] == key:
+        return cached[1]
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha1(data).hexdigest()
+
+    template = _TEMPLATES.get(digest)
+    if template is None:
+        if textfsm is None:
+            raise TemplateError('textfsm is required to parse with %s, please install textfsm' % path)
+        source = to_text(data, errors='surrogate_or_strict')
+        # the role's templates start with a YAML document marker that
+        # textfsm does not accept
+        if source.startswith('---\n'):
+            source = source[4:]
+        try:
+            template = _TEMPLATES[digest] = textfsm.TextFSM(io.StringIO(source))
+        except textfsm.TextFSMTemplateError as exc:
+            raise TemplateError('invalid textfsm template %s: %s' % (path, exc))
+
+    _PATHS[path] = (key, template)
+    return template
+
+
+def _copy(obj):
+    """ Returns a shallow copy of obj without the overhead of copy.copy """
+    clone = obj.__class__.__new__(obj.__class__)
+    clone.__dict__.update(obj.__dict__)
+    return clone
+
+
+def get_fsm(path):
+    """ Returns a TextFSM object for the template at path ready to parse
+
+    The object shares the compiled states and rules with the cached
+    template so creating one only costs a copy of the values.
+    """
+    template = _compile(path)
+    fsm = _copy(template)
+    fsm.values = list()
+    for value in template.values:
+        clone = _copy(value)
+        clone.fsm = fsm
+        clone.options = list()
+        for option in value.options:
+            option = _copy(option)
+            option.value = clone
+            clone.options.append(option)
+        fsm.values.append(clone)
+    # clears the record and the state kept by the options of the copies
+    fsm.Reset()
+    return fsm
+
+
+def parse(path, content):
+    """ Returns the header and rows of content parsed with the template """
+    fsm = get_fsm(path)
+    try:
+        rows = fsm.ParseText(content)
+    except textfsm.TextFSMError as exc:
+        raise TemplateError(to_text(exc))
+    return fsm.header, rows
+
+
+def parse_facts(path, content, name):
+    """ Returns the facts of the textfsm_parser engine for content
+
+    Each row is a dict of the header to the values of the row, the rows are
+    returned in the name fact.  Without name no facts are returned, like the
+    textfsm_parser action of network-engine.
+    """
+    header, rows = iter_rows(path, content)
+    if not name:
+        return {}
+    return {name: [dict(zip(header, row)) for row in rows]}
+
+
+def iter_rows(path, content):
+    """ Returns the header and a generator of the rows of content
+
+    The output is fed to the state machine STREAM_LINES lines at a time and
+    the rows found so far are yielded before the next lines are parsed.
+    """
+    fsm = get_fsm(path)
+
+    def rows():
+        lines = to_text(content).splitlines()
+        try:
+            for start in range(0, len(lines), STREAM_LINES):
+                fsm.ParseText('\n'.join(lines[start:start + STREAM_LINES]), eof=False)
+                for row in fsm._result:
+                    yield row
+                del fsm._result[:]
+                if fsm._cur_state_name in ('End', 'EOF'):
+                    break
+            for row in fsm.ParseText('', eof=True):
+                yield row
+        except textfsm.TextFSMError as exc:
+            raise TemplateError(to_text(exc))
+
+    return fsm.header, rows()
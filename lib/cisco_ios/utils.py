@@ -0,0 +1,181 @@
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import json
+import os
+import random
+import tempfile
+import time
+
+from ansible.module_utils.six import iteritems
+
+
+DEFAULT_CACHE_DIR = os.path.join('~', '.ansible', 'cache', 'cisco_ios')
+
+# the connection state fact set once the scp server has been enabled over
+# the persistent connection of the host, and the commands enabling it
+SCP_READY_FACT = 'ios_scp_server_ready'
+ENABLE_SCP_COMMANDS = ['configure terminal', 'ip scp server enable', 'end']
+
+# the number of seconds after which a value of the disk cache is not used
+# anymore and may be removed
+CACHE_MAX_AGE = 7 * 24 * 3600
+
+# the fraction of writes that look for values to remove in namespaces that
+# are only bounded by age, so the namespace is not listed on every write
+CACHE_EVICT_PROBABILITY = 0.01
+
+
+def cpu_time():
+    """ Returns the user and system CPU time of the process in seconds """
+    try:
+        return time.process_time()
+    except AttributeError:
+        # python 2 only has the clock tick resolution of os.times
+        times = os.times()
+        return times[0] + times[1]
+
+
+def get_cache_dir(*paths):
+    """ Returns the path to a directory in the role cache
+
+    The base directory defaults to ~/.ansible/cache/cisco_ios and can be
+    changed by setting the CISCO_IOS_CACHE_DIR environment variable.  The
+    directory is created if it does not already exist.
+    """
+    base = os.environ.get('CISCO_IOS_CACHE_DIR') or DEFAULT_CACHE_DIR
+    path = os.path.join(os.path.expanduser(base), *paths)
+    if not os.path.isdir(path):
+        try:
+            os.makedirs(path)
+        except OSError:
+            if not os.path.isdir(path):
+                raise
+    return path
+
+
+def read_cache(namespace, key, version, max_age=CACHE_MAX_AGE):
+    """ Returns the value stored in the disk cache or None
+
+    Any error reading the cache, a value written by a different version or
+    a value stored more than max_age seconds ago is treated as a cache miss.
+    """
+    try:
+        path = os.path.join(get_cache_dir(namespace), '%s.json' % key)
+        if time.time() - os.path.getmtime(path) > max_age:
+            return None
+        with open(path) as f:
+            cached = json.load(f)
+    except Exception:
+        return None
+    return cached.get('value') if cached.get('version') == version else None
+
+
+def write_cache(namespace, key, version, value, max_entries=None):
+    """ Stores value in the disk cache, errors are ignored
+
+    Values older than CACHE_MAX_AGE are removed from time to time.  When
+    max_entries is set the namespace keeps at most max_entries values, the
+    least recently written ones are removed.  The value must be
+    serializable as JSON.
+    """
+    tmp = None
+    try:
+        directory = get_cache_dir(namespace)
+        fd, tmp = tempfile.mkstemp(dir=directory)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'version': version, 'value': value}, f)
+        os.rename(tmp, os.path.join(directory, '%s.json' % key))
+        tmp = None
+        if max_entries is not None or random.random() < CACHE_EVICT_PROBABILITY:
+            _evict(directory, max_entries)
+    except Exception:
+        # the disk cache is only an optimization
+        if tmp is not None:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+
+
+def remove_cache(namespace, key):
+    """ Removes the value from the disk cache, errors are ignored """
+    try:
+        os.remove(os.path.join(get_cache_dir(namespace), '%s.json' % key))
+    except OSError:
+        pass
+
+
+def _evict(directory, max_entries):
+    """ Removes the expired entries of directory and any beyond max_entries """
+    entries = list()
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            entries.append((os.path.getmtime(path), path))
+        except OSError:
+            # removed by another process
+            continue
+    entries.sort(reverse=True)
+    expired = time.time() - CACHE_MAX_AGE
+    for index, (mtime, path) in enumerate(entries):
+        if mtime < expired or (max_entries is not None and index >= max_entries):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def get_connection_state(task_vars, name, socket_path):
+    """ Returns a copy of the state kept in the name fact for the connection
+
+    Facts outlive the play and may be saved by fact caching, so state about
+    the device is stored together with the path of the persistent connection
+    socket, which includes the pid of ansible-playbook.  State stored for a
+    different connection, or without a connection, is discarded.
+    """
+    state = task_vars.get(name)
+    if not socket_path or not isinstance(state, dict) or state.get('socket') != socket_path:
+        return {}
+    return dict(state.get('data') or {})
+
+
+def connection_state_fact(name, socket_path, data):
+    """ Returns the facts that store data as the state of the connection """
+    return {name: {'socket': socket_path, 'data': data}}
+
+
+def merge_facts(base, other):
+    """ Recursively merges other into a copy of base
+
+    Nested dicts are merged key by key, any other value (including lists)
+    found in other replaces the value in base.
+    """
+    combined = dict(base)
+    for key, value in iteritems(other):
+        if isinstance(value, dict) and isinstance(combined.get(key), dict):
+            combined[key] = merge_facts(combined[key], value)
+        else:
+            combined[key] = value
+    return combined
+
+
+def merge_existing_facts(facts, task_vars):
+    """ Merges facts with the facts that are already set for the host
+
+    Parsers extend facts that may already exist for the host, so the
+    returned facts need to include those to avoid dropping facts that were
+    set by previous runs.
+    """
+    merged = dict(facts)
+    for key, value in iteritems(facts):
+        existing = task_vars.get(key)
+        if isinstance(existing, dict) and isinstance(value, dict):
+            merged[key] = merge_facts(existing, value)
+    return merged
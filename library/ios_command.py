@@ -84,6 +84,16 @@ options:
         conditions, the interval indicates how long to wait before
         trying the command again.
     default: 1
+  backoff:
+    description:
+      - Configures how long to wait between retries.  With C(fixed) the
+        module waits I(interval) seconds between each of the I(retries).
+        With C(adaptive) the first retry is made after a short wait that
+        grows on every retry up to I(interval) seconds, until I(retries)
+        times I(interval) seconds have passed.  Only the commands referenced by the I(wait_for)
+        conditions that are not satisfied yet are run again on a retry.
+    default: fixed
+    choices: ['fixed', 'adaptive']
 """
 
 EXAMPLES = r"""
@@ -111,6 +121,17 @@ tasks:
       wait_for:
         - result[0] contains IOS
         - result[1] contains Loopback0
+
+  - name: wait for a bgp neighbor to be established, polling quickly at first
+    ios_command:
+      commands:
+        - show interfaces
+        - show ip bgp summary
+      wait_for:
+        - result[1] contains Estab
+      retries: 30
+      backoff: adaptive
+
   - name: run commands that require answering a prompt
     ios_command:
       commands:
@@ -150,6 +171,14 @@ from ansible.module_utils.network.common.parsing import Conditional
 from ansible.module_utils.six import string_types
 
 
+# the index of the command a wait_for conditional is evaluated against
+RESULT_INDEX_RE = re.compile(r'^result\[(\d+)\]')
+
+# the first wait and growth factor of the adaptive backoff
+ADAPTIVE_FIRST_WAIT = 0.25
+ADAPTIVE_FACTOR = 1.5
+
+
 def to_lines(stdout):
     for item in stdout:
         if isinstance(item, string_types):
@@ -175,6 +204,17 @@ def parse_commands(module, warnings):
     return commands
 
 
+def poll_indexes(conditionals, count):
+    """ Returns the indexes of the commands to run again for conditionals """
+    indexes = set()
+    for item in conditionals:
+        match = RESULT_INDEX_RE.match(item.key)
+        if not match or int(match.group(1)) >= count:
+            return list(range(count))
+        indexes.add(int(match.group(1)))
+    return sorted(indexes)
+
+
 def main():
     """main entry point for module execution
     """
@@ -185,7 +225,8 @@ def main():
         match=dict(default='all', choices=['all', 'any']),
 
         retries=dict(default=10, type='int'),
-        interval=dict(default=1, type='int')
+        interval=dict(default=1, type='int'),
+        backoff=dict(default='fixed', choices=['fixed', 'adaptive'])
     )
 
     argument_spec.update(ios_argument_spec)
@@ -206,10 +247,13 @@ def main():
     retries = module.params['retries']
     interval = module.params['interval']
     match = module.params['match']
+    backoff = module.params['backoff']
 
-    while retries > 0:
-        responses = run_commands(module, commands)
+    responses = run_commands(module, commands)
+    deadline = time.time() + retries * interval
+    wait = min(ADAPTIVE_FIRST_WAIT, interval)
 
+    while True:
         for item in list(conditionals):
             if item(responses):
                 if match == 'any':
@@ -217,11 +261,26 @@ def main():
                     break
                 conditionals.remove(item)
 
+        retries -= 1
         if not conditionals:
             break
 
-        time.sleep(interval)
-        retries -= 1
+        if backoff == 'adaptive':
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            time.sleep(min(wait, remaining))
+            wait = min(wait * ADAPTIVE_FACTOR, interval)
+        elif retries > 0:
+            time.sleep(interval)
+        else:
+            break
+
+        # only run the commands the remaining conditionals are evaluated
+        # against, unless a conditional does not reference a single command
+        pending = poll_indexes(conditionals, len(commands))
+        for index, response in zip(pending, run_commands(module, [commands[index] for index in pending])):
+            responses[index] = response
 
     if conditionals:
         failed_conditions = [item.raw for item in conditionals]
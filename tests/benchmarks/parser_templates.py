@@ -0,0 +1,416 @@
+#!/usr/bin/env python
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Benchmark every parser template in parser_templates against scaled captures
+
+Builds synthetic outputs with the requested number of interfaces, BGP
+peers, VRFs, access-list entries and so on, from the captures under
+tests/parser_templates where the role has one, and times each template
+(and its native parser, when the role ships one) for throughput and peak
+memory.  The results are compared with tests/benchmarks/baseline.json and
+the run fails when a template is slower or uses more memory than the
+baseline allows.
+
+Timings are stored relative to a fixed calibration workload, timed
+between the templates throughout the run, so the baseline can be
+compared across machines.
+
+    python tests/benchmarks/parser_templates.py [--sizes 100,1000] [--update]
+    python tests/benchmarks/parser_templates.py --sizes 1000,10000,100000 --filter show_interfaces
+"""
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import argparse
+import gc
+import json
+import os
+import re
+import sys
+import time
+
+ROLE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(ROLE_DIR, 'lib'))
+
+from ansible.parsing.dataloader import DataLoader
+from ansible.plugins.loader import filter_loader
+from ansible.template import Templar
+
+from cisco_ios.command_parser import CommandParser, UnsupportedDirective, load_template
+from cisco_ios.parsers import get_native_parser
+from cisco_ios.parsers.show_ip_access_lists import parse_access_lists
+from cisco_ios import textfsm_templates
+
+from show_interfaces import build_capture as build_show_interfaces
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+try:
+    import textfsm
+except ImportError:
+    textfsm = None
+
+
+TEMPLATES_DIR = os.path.join(ROLE_DIR, 'parser_templates')
+CAPTURES_DIR = os.path.join(ROLE_DIR, 'tests', 'parser_templates', 'cli')
+# the time after which a template is not timed again
+MAX_REPEAT_TIME = 5
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+def read_capture(*path):
+    with open(os.path.join(CAPTURES_DIR, *path)) as f:
+        return f.read()
+
+
+def interface_name(prefix, index):
+    return '%s%d/%d/%d' % (prefix, index // 4800 + 1, index // 48 % 10, index % 48 + 1)
+
+
+def build_show_version(count):
+    """ show version does not grow with the device, count is ignored """
+    return read_capture('show_version', '15.5.1.txt')
+
+
+def build_show_ip_bgp_summary(count):
+    content = read_capture('show_ip_bgp_summary', '03.14.00.S.txt')
+    header, rows = content.split('\nNeighbor', 1)
+    rows = rows.splitlines()[1:]
+    lines = [header, 'Neighbor' + content.split('\nNeighbor', 1)[1].splitlines()[0]]
+    for index in range(count):
+        row = rows[index % len(rows)].split(None, 1)
+        lines.append('%-15s %s' % ('10.%d.%d.%d' % (index >> 16 & 255, index >> 8 & 255, index & 255), row[1]))
+    return '\n'.join(lines) + '\n'
+
+
+def build_show_ip_vrf_detail(count):
+    content = read_capture('show_ip_vrf_detail', '03.14.00.S.txt')
+    sections = [s for s in re.split(r'\n(?=VRF )', content) if s.strip()]
+    lines = list()
+    for index in range(count):
+        section = sections[index % len(sections)].rstrip('\n')
+        section = re.sub(r'^VRF \S+ \(VRF Id = \d+\)', 'VRF VRF%d (VRF Id = %d)' % (index, index + 1), section)
+        lines.append(section + '\n')
+    return '\n'.join(lines)
+
+
+def build_neighbors_detail(count, section):
+    return ''.join(section % dict(index=index, port=interface_name('GigabitEthernet', index),
+                                  remote_port=interface_name('GigabitEthernet', count - index))
+                   for index in range(count))
+
+
+CDP_SECTION = """-------------------------
+Device ID: switch%(index)d.example.com
+Entry address(es):
+  IP address: 10.0.0.1
+Platform: cisco WS-C3850-48P,  Capabilities: Router Switch IGMP
+Interface: %(port)s,  Port ID (outgoing port): %(remote_port)s
+Holdtime : 150 sec
+
+Version :
+Cisco IOS Software, IOS-XE Software, Catalyst L3 Switch Software (CAT3K_CAA-UNIVERSALK9-M), Version 03.06.06E RELEASE SOFTWARE (fc1)
+
+advertisement version: 2
+Native VLAN: 1
+Duplex: full
+
+"""
+
+LLDP_SECTION = """------------------------------------------------
+Local Intf: %(port)s
+Chassis id: 0c27.24d1.8b00
+Port id: %(remote_port)s
+Port Description: uplink
+System Name: switch%(index)d.example.com
+
+System Description:
+Cisco IOS Software, C3750E Software (C3750E-UNIVERSALK9-M), Version 15.0(2)SE5
+
+Time remaining: 98 seconds
+System Capabilities: B,R
+Enabled Capabilities: B
+
+"""
+
+TRANSCEIVER_HEADER = """If device is externally calibrated, only calibrated values are printed.
+++ : high alarm, +  : high warning, -  : low warning, -- : low alarm.
+NA or N/A: not applicable, Tx: transmit, Rx: receive.
+mA: milliamperes, dBm: decibels (milliwatts).
+
+                                           Optical   Optical
+            Temperature  Voltage  Current  Tx Power  Rx Power
+Port        (Celsius)    (Volts)  (mA)     (dBm)     (dBm)
+---------   -----------  -------  -------  --------  --------
+"""
+
+
+def build_show_interfaces_transceiver(count):
+    row = '%-12s27.5         3.29     6.1      -2.3      -3.0\n'
+    return TRANSCEIVER_HEADER + ''.join(row % interface_name('Te', index) for index in range(count))
+
+
+def build_show_ip_prefix_list(count):
+    """ count prefix-list entries in lists of 10 """
+    lines = list()
+    for index in range(0, count, 10):
+        entries = min(10, count - index)
+        lines.append('ip prefix-list PL%d: %d entries' % (index // 10, entries))
+        for seq in range(entries):
+            value = index + seq
+            lines.append('   seq %d permit 10.%d.%d.0/24 le 32' % ((seq + 1) * 5, value >> 8 & 255, value & 255))
+    return '\n'.join(lines) + '\n'
+
+
+def build_show_run_interface(count):
+    lines = list()
+    for index in range(count):
+        lines.extend([
+            'interface %s' % interface_name('GigabitEthernet', index),
+            ' description link %d' % index,
+            ' ip address 10.%d.%d.1 255.255.255.0' % (index >> 8 & 255, index & 255),
+            ' ip helper-address 10.255.0.1',
+            ' speed 1000',
+            ' duplex full',
+            ' no cdp enable',
+            '!'
+        ])
+    return '\n'.join(lines) + '\n'
+
+
+def build_running_config(count):
+    return 'hostname router1\nip domain-name example.com\nip routing\n!\n' + build_show_run_interface(count)
+
+
+def build_show_ip_access_lists(count):
+    """ count access-list entries in lists of 100 """
+    lines = list()
+    for index in range(0, count, 100):
+        lines.append('Extended IP access list ACL%d' % (index // 100))
+        for seq in range(min(100, count - index)):
+            value = index + seq
+            lines.append('    %d permit tcp 10.%d.%d.0 0.0.0.255 host 192.168.1.1 eq 443 (%d matches)'
+                         % ((seq + 1) * 10, value >> 8 & 255, value & 255, value))
+    return '\n'.join(lines) + '\n'
+
+
+def build_acl_logs(count):
+    return ''.join('%06d: Jun  1 10:00:00: %%SEC-6-IPACCESSLOGP: list ACL1 permitted tcp 10.%d.%d.1(%d) -> 192.168.1.1(443), 1 packet\n'
+                   % (index, index >> 8 & 255, index & 255, 1024 + index % 60000) for index in range(count))
+
+
+# template path relative to parser_templates, engine, fixture builder and
+# whether the fixture grows with the size
+SCENARIOS = [
+    ('cli/show_interfaces.yaml', 'command_parser', build_show_interfaces, True),
+    ('cli/show_interfaces_transceiver.yaml', 'command_parser', build_show_interfaces_transceiver, True),
+    ('cli/show_cdp_neighbors_detail.yaml', 'command_parser', lambda count: build_neighbors_detail(count, CDP_SECTION), True),
+    ('cli/show_lldp_neighbors_detail.yaml', 'command_parser', lambda count: build_neighbors_detail(count, LLDP_SECTION), True),
+    ('cli/show_ip_bgp_summary.yaml', 'command_parser', build_show_ip_bgp_summary, True),
+    ('cli/show_ip_vrf_detail.yaml', 'command_parser', build_show_ip_vrf_detail, True),
+    ('cli/show_version.yaml', 'command_parser', build_show_version, False),
+    ('config/show_ip_prefix_list.yaml', 'command_parser', build_show_ip_prefix_list, True),
+    ('config/show_run_interface.yaml', 'command_parser', build_show_run_interface, True),
+    ('config_manager/global.yaml', 'command_parser', build_running_config, True),
+    ('net_operations/show_ip_access_list.yaml', 'textfsm_parser', build_show_ip_access_lists, True),
+    ('net_operations/show_logs_acl_logs.yaml', 'textfsm_parser', build_acl_logs, True),
+]
+
+# native parsers that are not registered with get_native_parser
+NATIVE_PARSERS = {
+    'net_operations/show_ip_access_list.yaml': parse_access_lists,
+}
+
+
+def calibrate(repeat=5):
+    """ Returns the median time of repeat runs of a fixed regex and dict workload
+
+    Benchmark timings are divided by the median of every calibration of the
+    run so results recorded on one machine can be compared with another.
+    The workload runs for about a tenth of a second so timer resolution and
+    a single slow run do not move the unit.
+    """
+    content = build_show_run_interface(20000)
+    regex = re.compile(r'^interface (\S+)$', re.M)
+    samples = list()
+    for _ in range(repeat):
+        gc.collect()
+        start = time.time()
+        facts = dict()
+        for match in regex.finditer(content):
+            facts[match.group(1)] = {'name': match.group(1), 'lines': content[match.end():match.end() + 80].split('\n')}
+        samples.append(time.time() - start)
+    return median(samples)
+
+
+def median(values):
+    values = sorted(values)
+    middle = len(values) // 2
+    if len(values) % 2:
+        return values[middle]
+    return (values[middle - 1] + values[middle]) / 2.0
+
+
+def count_rows(path, content):
+    """ Streams the rows of content without keeping them """
+    header, rows = textfsm_templates.iter_rows(path, content)
+    return header, sum(1 for _ in rows)
+
+
+def parsers_for(name, engine, templar):
+    """ Yields (label, callable) for each way the template is parsed """
+    path = os.path.join(TEMPLATES_DIR, name)
+    if engine == 'command_parser':
+        template = load_template(path, use_disk_cache=False)
+        yield 'template', lambda content: CommandParser(templar).parse(template, content, {})
+        native = get_native_parser(path)
+        if native is not None:
+            yield 'native', native
+    elif textfsm is not None:
+        yield 'textfsm', lambda content: textfsm_templates.parse(path, content)
+        yield 'textfsm-stream', lambda content: count_rows(path, content)
+    if name in NATIVE_PARSERS:
+        yield 'native', NATIVE_PARSERS[name]
+
+
+def measure(parser, content, repeat, memory):
+    """ Returns the best time of up to repeat runs and the peak memory in bytes """
+    best = None
+    total = 0
+    for _ in range(repeat):
+        gc.collect()
+        start = time.time()
+        parser(content)
+        elapsed = time.time() - start
+        best = elapsed if best is None else min(best, elapsed)
+        # slow runs are stable enough, do not spend minutes repeating them
+        total += elapsed
+        if total > MAX_REPEAT_TIME:
+            break
+
+    peak = None
+    if memory and tracemalloc is not None:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            parser(content)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return best, peak
+
+
+def check(results, baseline, tolerance, min_time):
+    """ Returns the failures of results compared with the baseline """
+    failures = list()
+    for key, result in sorted(results.items()):
+        expected = baseline.get(key)
+        if not expected:
+            continue
+        limit = expected['relative_time'] * (1 + tolerance)
+        if result['relative_time'] > limit and result['seconds'] >= min_time:
+            failures.append('%s: %.1f calibration units, baseline %.1f' % (key, result['relative_time'], expected['relative_time']))
+        if result.get('peak_memory') and expected.get('peak_memory'):
+            if result['peak_memory'] > expected['peak_memory'] * (1 + tolerance):
+                failures.append('%s: peak memory %.1fMB, baseline %.1fMB'
+                                % (key, result['peak_memory'] / 1048576.0, expected['peak_memory'] / 1048576.0))
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', default='100,1000',
+                        help='comma separated number of interfaces, peers, entries to scale the captures to')
+    parser.add_argument('--filter', default=None,
+                        help='only run the templates whose path contains this string')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of times each template is timed, the best time is used')
+    parser.add_argument('--tolerance', type=float, default=1.0,
+                        help='fail when a template is this fraction slower or larger than the baseline')
+    parser.add_argument('--min-time', type=float, default=0.05,
+                        help='ignore time regressions of runs faster than this many seconds')
+    parser.add_argument('--no-memory', action='store_true',
+                        help='do not measure peak memory, which runs each template once more')
+    parser.add_argument('--baseline', default=BASELINE,
+                        help='path to the baseline json')
+    parser.add_argument('--update', action='store_true',
+                        help='record the results in the baseline instead of comparing with it')
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+
+    filter_loader.add_directory(os.path.join(ROLE_DIR, 'filter_plugins'))
+    templar = Templar(loader=DataLoader())
+
+    # calibrations are interleaved with the templates so a machine that slows
+    # down or speeds up during the run moves the unit as well
+    calibrations = [calibrate()]
+
+    results = dict()
+    for name, engine, build, scales in SCENARIOS:
+        if args.filter and args.filter not in name:
+            continue
+        calibrations.append(calibrate())
+        for size in (sizes if scales else [1]):
+            content = build(size)
+            try:
+                parsers = list(parsers_for(name, engine, templar))
+            except UnsupportedDirective as exc:
+                print('%-58s skipped: %s' % (name, exc))
+                break
+            if not parsers:
+                print('%-58s skipped: %s is not installed' % (name, engine.split('_')[0]))
+                break
+            for label, func in parsers:
+                seconds, peak = measure(func, content, args.repeat, not args.no_memory)
+                key = '%s:%s@%d' % (name, label, size)
+                results[key] = {
+                    'seconds': seconds,
+                    'peak_memory': peak,
+                    'bytes': len(content)
+                }
+                print('%-58s %7.3fs %8.1fMB/s %s' % (
+                    key, seconds, len(content) / 1048576.0 / seconds if seconds else float('inf'),
+                    '%8.1fMB peak' % (peak / 1048576.0) if peak else ''))
+
+    unit = median(calibrations)
+    print('calibration: %.4fs, median of %d' % (unit, len(calibrations)))
+    for result in results.values():
+        result['relative_time'] = round(result['seconds'] / unit, 2)
+        result['seconds'] = round(result['seconds'], 4)
+
+    if args.update:
+        baseline = dict()
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print('updated %s' % args.baseline)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print('no baseline found at %s, run with --update to record one' % args.baseline)
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    failures = check(results, baseline, args.tolerance, args.min_time)
+    for failure in failures:
+        print('FAIL: %s' % failure)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
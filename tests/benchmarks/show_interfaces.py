@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# (c) 2018, Ansible by Red Hat, inc
+# GNU General Public License v3.0+ (see COPYING or https://www.gnu.org/licenses/gpl-3.0.txt)
+#
+# You should have received a copy of the GNU General Public License
+# along with Ansible.  If not, see <http://www.gnu.org/licenses/>.
+#
+"""
+Benchmark the native `show interfaces` parser against the parser template
+
+Builds a synthetic capture by repeating the interfaces found in
+tests/parser_templates/cli/show_interfaces/03.16.08.S.txt as uniquely
+named subinterfaces, parses it with both the compiled show_interfaces.yaml
+template and the native parser, verifies both return the same facts and
+reports the speedup.
+
+    python tests/benchmarks/show_interfaces.py [--interfaces 5000] [--min-speedup 10]
+"""
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import argparse
+import os
+import re
+import sys
+import time
+
+ROLE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.join(ROLE_DIR, 'lib'))
+
+from ansible.parsing.dataloader import DataLoader
+from ansible.template import Templar
+
+from cisco_ios.command_parser import CommandParser, load_template
+from cisco_ios.parsers import get_native_parser
+
+
+TEMPLATE = os.path.join(ROLE_DIR, 'parser_templates', 'cli', 'show_interfaces.yaml')
+FIXTURE = os.path.join(ROLE_DIR, 'tests', 'parser_templates', 'cli', 'show_interfaces', '03.16.08.S.txt')
+
+SECTION_RE = re.compile(r'^(\S+)( is (?:up|down|administratively down),)', re.M)
+
+
+def build_capture(count):
+    """ Returns a `show interfaces` capture with count interfaces """
+    with open(FIXTURE) as f:
+        content = f.read()
+
+    starts = [m.start() for m in SECTION_RE.finditer(content)] + [len(content)]
+    sections = [content[s:e].rstrip('\n') for s, e in zip(starts, starts[1:])]
+
+    lines = list()
+    for index in range(count):
+        section = sections[index % len(sections)]
+        name = section.split(None, 1)[0].split('.')[0]
+        lines.append(SECTION_RE.sub(r'%s.%s\2' % (name, index + 1), section, count=1))
+    return '\n'.join(lines) + '\n'
+
+
+def timed(func, *args):
+    start = time.time()
+    res = func(*args)
+    return res, time.time() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--interfaces', type=int, default=5000,
+                        help='number of interfaces in the synthetic capture')
+    parser.add_argument('--min-speedup', type=float, default=10.0,
+                        help='fail when the native parser is not at least this much faster')
+    args = parser.parse_args()
+
+    content = build_capture(args.interfaces)
+    templar = Templar(loader=DataLoader())
+    template = load_template(TEMPLATE)
+    native = get_native_parser(TEMPLATE)
+
+    expected, template_time = timed(CommandParser(templar).parse, template, content, {})
+    actual, native_time = timed(native, content)
+
+    if actual != expected:
+        print('FAIL: native parser facts do not match the parser template')
+        return 1
+
+    parsed = len(actual['cisco_ios']['interfaces'])
+    speedup = template_time / native_time if native_time else float('inf')
+    print('interfaces: %d (%d bytes)' % (parsed, len(content)))
+    print('template:   %.3fs' % template_time)
+    print('native:     %.3fs' % native_time)
+    print('speedup:    %.1fx' % speedup)
+
+    if parsed != args.interfaces:
+        print('FAIL: expected %d interfaces, parsed %d' % (args.interfaces, parsed))
+        return 1
+    if speedup < args.min_speedup:
+        print('FAIL: speedup is below %.1fx' % args.min_speedup)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())